@@ -8,29 +8,96 @@ IMPORTS
 
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord.ui import Button, View
-import json
 import os
 import asyncio
 import re
 import sys
 import functools
+import collections
+import io
+import contextlib
+import math
+import resource
+import signal
+import time
 import tomllib
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from google import genai
 from google.genai import types  # type: ignore
 from dotenv import load_dotenv  # type: ignore
 from types import SimpleNamespace
+from storage import (
+    io_counter,
+    tidy_number,
+    get_value,
+    load_values,
+    get_scaled_value,
+    award_value,
+    to_scaled,
+    to_points,
+    set_value,
+    load_ranks,
+    list_rank_names,
+    edit_rank,
+    remove_rank,
+    load_live_leaderboards,
+    set_live_leaderboard,
+    remove_live_leaderboard,
+    load_points,
+    get_points,
+    add_points,
+    set_points,
+    adjust_points,
+    mark_joined,
+    mark_left,
+    remove_users,
+    restore_user,
+    update_change_context,
+    points_store,
+    points_archive,
+    points_ledger,
+    daily_totals,
+    config_store,
+    file_lock,
+)
+from logs import log, setup_logging, interaction_fields
+from expiry import ExpiryQueue
+from members import MemberRegistry
+from privileges import PrivilegeTable
+from recompute import RECOMPUTE_KIND, RECOMPUTE_LOCK_FILE, replay_awards
+from diagnostics import (
+    PROFILE_MAX_SECONDS,
+    profile_loop,
+    profile_running,
+    memory_baseline,
+    memory_report,
+    memory_stop,
+)
+from metrics import (
+    command_stats,
+    record_command,
+    instrument_api_calls,
+    loop_lag,
+    register_gauge,
+    start_metrics_server,
+    time_gemini_call,
+)
 
 """
 CONSTANTS
 """
 
-POINTS_FILE = "points.json"
-CONFIG_FILE = "config.json"
-JSON_CLEANUP_INTERVAL = 12  # hours
 REMOVE_AFTER_DAYS = 30  # days
+HISTORY_PAGE_SIZE = 8  # keeps a page of long reasons and links under 2000 chars
+RECOMPUTE_PREVIEW_SIZE = 15
+LEADERBOARD_PAGE_SIZE = 10
+AUTOCOMPLETE_LIMIT = 25  # most choices Discord accepts
+LEADERBOARD_CACHE_PAGES = 64  # rendered pages kept per guild between point changes
+LEADERBOARD_BUTTON_COOLDOWN = (3, 5.0)  # pager presses per seconds, per message
+LIVE_LEADERBOARD_TICK = 15  # seconds between checks for changed live leaderboards
+BOT_TOKEN_ENV_VARS = ["BOT_TOKEN"]  # override with e.g. `BotV1,5.py BOT_TOKEN BETA_BOT_TOKEN`
 
 """
 ROLES AND USER IDS
@@ -45,6 +112,7 @@ contractofficer_id = 1406564078666649660
 nameplatedesigner_id = 1405169617751638076
 booster_id = 1385279332049485935
 
+# Defaults; the "privileges" section of config.json overrides them
 ALWAYS_PRIVILEGED_ROLE_IDS = [test_id, commander_id, chiefofstaff_id]
 ALWAYS_PRIVILEGED_USER_IDS = [805175554209873940]
 PRIVILEGE_GROUP_ROLE_IDS = {
@@ -52,53 +120,30 @@ PRIVILEGE_GROUP_ROLE_IDS = {
     "config": [chiefoflogistics_id],
     "nameplatedesigner": [nameplatedesigner_id],
 }
+privileges = PrivilegeTable(
+    ALWAYS_PRIVILEGED_ROLE_IDS, ALWAYS_PRIVILEGED_USER_IDS, PRIVILEGE_GROUP_ROLE_IDS
+)
 
 """
 UTILITY FUNCTIONS
 """
 
 
-def tidy_number(num):
-    return int(num) if isinstance(num, float) and num.is_integer() else num
-
-
-def load_json(file, default):
-    if not os.path.exists(file):
-        with open(file, "w") as f:
-            json.dump(default, f, indent=4)
-    with open(file, "r") as f:
-        data = json.load(f)
-    return {
-        k: tidy_number(v) if isinstance(v, (int, float)) else v for k, v in data.items()
-    }
-
-
-def save_json(file, data):
-    with open(file, "w") as f:
-        json.dump(data, f, indent=4)
-
-
 def privileged_check(group: str = None, target_param: str | list[str] = None):
-    async def predicate(interaction: discord.Interaction) -> bool:
-        allowed_roles = set(ALWAYS_PRIVILEGED_ROLE_IDS)
-        if group in PRIVILEGE_GROUP_ROLE_IDS:
-            allowed_roles.update(PRIVILEGE_GROUP_ROLE_IDS[group])
+    names = [target_param] if isinstance(target_param, str) else target_param or []
 
-        def has_permission(member: discord.Member) -> bool:
-            return member.id in ALWAYS_PRIVILEGED_USER_IDS or any(
-                r.id in allowed_roles for r in member.roles
-            )
+    def has_permission(member: discord.Member) -> bool:
+        return privileges.allowed(member, group)
 
+    async def predicate(interaction: discord.Interaction) -> bool:
         # Collect targets
         targets = []
-        if target_param:
-            names = [target_param] if isinstance(target_param, str) else target_param
-            for name in names:
-                target = getattr(interaction.namespace, name, None)
-                if isinstance(target, discord.User):
-                    target = interaction.guild.get_member(target.id)
-                if isinstance(target, discord.Member):
-                    targets.append(target)
+        for name in names:
+            target = getattr(interaction.namespace, name, None)
+            if isinstance(target, discord.User):
+                target = interaction.guild.get_member(target.id)
+            if isinstance(target, discord.Member):
+                targets.append(target)
 
         # Check executor
         executor = interaction.user
@@ -127,29 +172,6 @@ POINTS AND CONFIG
 """
 
 
-def edit_rank(name: str, role_id: int, points_required: int, requires_roles: list[int]):
-    data = load_config()
-    data["ranks"][name] = {
-        "role_id": role_id,
-        "points_required": points_required,
-        "requires_roles": requires_roles,
-    }
-    save_config(data)
-
-
-def remove_rank(name: str):
-    data = load_config()
-    if name in data["ranks"]:
-        del data["ranks"][name]
-        save_config(data)
-        return True
-    return False
-
-
-def list_rank_names():
-    return list(load_ranks().keys())
-
-
 async def rank_autocomplete(
     interaction: discord.Interaction, current: str
 ) -> list[app_commands.Choice[str]]:
@@ -211,125 +233,6 @@ class RankEditModal(discord.ui.Modal, title="Add or Edit Rank"):
             await interaction.response.send_message(msg, ephemeral=True)
 
 
-def load_points():
-    data = load_json(POINTS_FILE, {})
-    for uid, info in data.items():
-        info["points"] = tidy_number(info.get("points", 0))
-    return data
-
-
-def save_points(data):
-    for uid, info in data.items():
-        info["points"] = tidy_number(info.get("points", 0))
-    save_json(POINTS_FILE, data)
-
-
-def load_values():
-    default_values = {
-        "ad": 0,
-        "adX3": 0,
-        "recruitment": 0,
-        "recruitmentsession": 0,
-        "rally": 0,
-        "rallyX5": 0,
-        "patrol": 0,
-        "gamenight": 0,
-        "training": 0,
-        "raid": 0,
-        "hosting": 0,
-        "cohosting": 0,
-        "booster": 0,
-        "joint": 0,
-        "eventlogging": 0,
-        "contractpayment": 0,
-        "nameplate": 0,
-        "basecommander": 0,
-        "bank": 0,
-        "goldbar": 0,
-        "trainee": 0,
-        "visitortransport": 0,
-        "pizzadelivery": 0,
-    }
-    if not os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, "w") as f:
-            json.dump({"values": default_values, "ranks": {}}, f, indent=4)
-    with open(CONFIG_FILE, "r") as f:
-        data = json.load(f)
-    if "values" not in data:
-        data["values"] = default_values
-    for key, val in default_values.items():
-        if key not in data["values"]:
-            data["values"][key] = val
-    for key in data["values"]:
-        data["values"][key] = tidy_number(data["values"][key])
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(data, f, indent=4)
-
-    return data["values"]
-
-
-def load_config():
-    if not os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, "w") as f:
-            json.dump({"values": {}, "ranks": {}}, f, indent=4)
-    with open(CONFIG_FILE, "r") as f:
-        return json.load(f)
-
-
-def save_config(data):
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(data, f, indent=4)
-
-
-def get_value(key: str):
-    return load_config()["values"].get(key, 0)
-
-
-def set_value(key: str, value: float):
-    data = load_config()
-    if "values" not in data:
-        data["values"] = {}
-    data["values"][key] = tidy_number(value)
-    save_config(data)
-
-
-def load_ranks():
-    return load_config().get("ranks", {})
-
-
-def add_rank(name: str, role_id: int, points_required: int, requires_roles: list[int]):
-    data = load_config()
-    data["ranks"][name] = {
-        "role_id": role_id,
-        "points_required": points_required,
-        "requires_roles": requires_roles,
-    }
-    save_config(data)
-
-
-"""
-POINTS HELPERS
-"""
-
-
-def get_points(uid: int):
-    return load_points().get(str(uid), {}).get("points", 0)
-
-
-def add_points(uid: int, amount: int):
-    data = load_points()
-    entry = data.setdefault(str(uid), {"points": 0, "left_at": None})
-    entry["points"] += amount
-    save_points(data)
-
-
-def set_points(uid: int, amount: int):
-    data = load_points()
-    entry = data.setdefault(str(uid), {"points": 0, "left_at": None})
-    entry["points"] = amount
-    save_points(data)
-
-
 """
 CHECK FOR PROMOTIONS
 """
@@ -359,7 +262,7 @@ async def check_for_promotion(member: discord.Member):
             continue
 
         if (
-            points >= required_points
+            points >= to_scaled(required_points)
             and all(rid in user_role_ids for rid in required_roles)
             and role_id not in user_role_ids
         ):
@@ -403,7 +306,7 @@ def promotion_check(_func=None, *, target_param: str = "user"):
                     base_msg, allowed_mentions=discord.AllowedMentions.none()
                 )
 
-            print(base_msg)
+            log.debug(base_msg)
             return base_msg
 
         return wrapper
@@ -427,68 +330,193 @@ intents.message_content = True
 intents.members = True
 intents.guilds = True
 
-bot = commands.Bot(command_prefix="/", intents=intents)
 points_group = app_commands.Group(name="points", description="EXP system")
 log_group = app_commands.Group(name="log", description="Logging actions")
 stats_group = app_commands.Group(name="stats", description="Bot statistics")
 config_group = app_commands.Group(name="config", description="Bot configuration")
-bot.tree.add_command(points_group)
-bot.tree.add_command(log_group)
-bot.tree.add_command(stats_group)
-bot.tree.add_command(config_group)
+hosted_bots = {}  # token env var -> commands.Bot, all sharing this process
+log_forwarder = None  # logs.WebhookLogHandler when DISCORD_WEBHOOK_URL is set
+departures = ExpiryQueue(timedelta(days=REMOVE_AFTER_DAYS).total_seconds())
+member_registry = MemberRegistry()
+leaderboard_pages = {}  # guild id -> (versions, rankings, rendered pages)
+leaderboard_button_cooldown = commands.CooldownMapping.from_cooldown(
+    *LEADERBOARD_BUTTON_COOLDOWN, lambda interaction: interaction.message.id
+)
+live_leaderboard_state = {}  # channel id -> (top places shown, time.monotonic() of the edit)
+recompute_lock = asyncio.Lock()  # held from a recompute's preview until it's applied
 load_dotenv()
 
+
+def record_interaction(interaction: discord.Interaction, failed=False):
+    started = interaction.extras.get("started")
+    if interaction.command is None or started is None:
+        return
+    record_command(
+        interaction.command.qualified_name,
+        time.perf_counter() - started,
+        interaction.extras["io"],
+        failed,
+    )
+
+
+class ASOFCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Runs in the same task as the command, so storage sees the counter
+        interaction.extras["started"] = time.perf_counter()
+        interaction.extras["io"] = collections.Counter()
+        io_counter.set(interaction.extras["io"])
+        # Tell the points ledger who is behind any change this command makes
+        options = [
+            f"{name}={value}"
+            for name, value in interaction.namespace
+            if not isinstance(value, (discord.User, discord.Member))
+        ]
+        command = interaction.command
+        update_change_context(
+            actor=interaction.user.id,
+            reason=" ".join([command.qualified_name if command else "?", *options]),
+            source=f"https://discord.com/channels/{interaction.guild_id or '@me'}/{interaction.channel_id}",
+        )
+        return True
+
+    async def on_error(
+        self, interaction: discord.Interaction, error: app_commands.AppCommandError
+    ):
+        if isinstance(error, app_commands.CheckFailure):
+            log.info("Command denied", extra=interaction_fields(interaction))
+            return
+        record_interaction(interaction, failed=True)
+        log.error(
+            "Command failed: %s",
+            error,
+            exc_info=error,
+            extra=interaction_fields(interaction),
+        )
+
+
+@functools.cache
+def get_genai_client():
+    return genai.Client(api_key=os.getenv("GENAI_API_KEY"))
+
+
+def process_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def bot_cache_stats(bot: commands.Bot):
+    members = [m for g in bot.guilds for m in g.members]
+    channels = [c for g in bot.guilds for c in g.channels]
+    roles = [r for g in bot.guilds for r in g.roles]
+    messages = bot.cached_messages
+    # Shallow sizes only, so this undercounts, but it shows which bot's
+    # caches are growing relative to the others.
+    approx_bytes = sum(
+        sys.getsizeof(obj)
+        for objs in (members, channels, roles, messages, bot.users)
+        for obj in objs
+    )
+    return {
+        "guilds": len(bot.guilds),
+        "members": len(members),
+        "users": len(bot.users),
+        "messages": len(messages),
+        "approx_bytes": approx_bytes,
+        "latency_ms": round(bot.latency * 1000) if math.isfinite(bot.latency) else None,
+    }
+
 """
 EVENTS
 """
 
 
-@bot.event
-async def on_ready():
-    print(f"Logged in as {bot.user}")
+async def on_ready(bot: commands.Bot):
+    log.info("Logged in as %s", bot.user)
 
     try:
         synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} commands.")
+        log.info("Synced %d commands.", len(synced))
     except Exception as e:
-        print(f"Command sync failed: {e}")
+        log.error("Command sync failed: %s", e)
+
+    for guild in bot.guilds:
+        member_registry.load(guild)
+    privileges.clear()  # roles may have changed while disconnected
+
+    stats = bot_cache_stats(bot)
+    log.info(
+        "%s: %sms gateway latency, %d members cached (~%.0f KiB), process RSS %.1f MiB",
+        bot.user,
+        stats["latency_ms"],
+        stats["members"],
+        stats["approx_bytes"] / 2**10,
+        process_rss_bytes() / 2**20,
+    )
+
+
+async def on_app_command_completion(
+    interaction: discord.Interaction, command: app_commands.Command
+):
+    record_interaction(interaction)
+    log.info("Command completed", extra=interaction_fields(interaction))
 
 
-@bot.event
 async def on_member_join(member):
-    data = load_points()
-    if str(member.id) not in data:
-        data[str(member.id)] = {"points": 0, "left_at": None}
-        save_points(data)
-        print(f"Added {member.name} to points.json")
+    member_registry.add(member)
+    departures.cancel(str(member.id))
+    restored = restore_user(member.id)
+    if restored:
+        log.info(
+            "Restored %s from the archive with %s points",
+            member.name,
+            to_points(restored["centipoints"]),
+        )
+        return
+    joined = mark_joined(member.id)
+    if joined == "added":
+        log.info("Added %s to points.json", member.name)
+    elif joined == "rejoined":
+        log.info("%s rejoined, keeping their points", member.name)
+
+
+async def on_member_update(before, after):
+    if before.roles != after.roles:
+        privileges.forget(after)
 
 
-@bot.event
 async def on_member_remove(member):
-    data = load_points()
-    if str(member.id) in data:
-        data[str(member.id)]["left_at"] = datetime.now().isoformat()
-        save_points(data)
-        print(f"Marked {member.name} as left at {datetime.now().isoformat()}")
-
-
-@tasks.loop(hours=JSON_CLEANUP_INTERVAL)
-async def cleanup_inactive_users():
-    data = load_points()
-    now = datetime.utcnow()
-    removed = [
-        uid
-        for uid, info in data.items()
-        if info.get("left_at")
+    member_registry.remove(member)
+    privileges.forget(member)
+    left_at = datetime.now().isoformat()
+    if mark_left(member.id, left_at):
+        departures.schedule(str(member.id), left_at)
+        log.info("Marked %s as left at %s", member.name, left_at)
+
+
+async def on_guild_remove(guild):
+    member_registry.forget(guild)
+
+
+def expire_departed(uids: list[str]):
+    # Check the stored left_at again, another process may have changed it
+    now = datetime.now()
+    removed = remove_users(
+        lambda info: info.get("left_at")
         and now - datetime.fromisoformat(info["left_at"])
-        > timedelta(days=REMOVE_AFTER_DAYS)
-    ]
-    for uid in removed:
-        del data[uid]
+        > timedelta(days=REMOVE_AFTER_DAYS),
+        uids,
+        archive=True,
+    )
+    points_data = load_points()
+    for uid in set(uids) - set(removed):
+        if points_data.get(uid, {}).get("left_at"):
+            departures.schedule(uid, points_data[uid]["left_at"])
     if removed:
-        save_points(data)
-        print(
-            f"Removed {len(removed)} users inactive for over {REMOVE_AFTER_DAYS} days."
+        log.info(
+            "Archived %d users inactive for over %d days.", len(removed), REMOVE_AFTER_DAYS
         )
 
 
@@ -500,9 +528,164 @@ COMMANDS
 # /stats ping
 @stats_group.command(name="ping", description="Check the bot latency.")
 async def ping(interaction: discord.Interaction):
-    msg = f"Pong! {round(bot.latency * 1000)}ms"
+    msg = f"Pong! {round(interaction.client.latency * 1000)}ms"
+    await interaction.response.send_message(msg, ephemeral=True)
+    log.debug(msg)
+
+
+# /stats bots
+@stats_group.command(
+    name="bots", description="Show gateway latency and cache size of each hosted bot."
+)
+async def stats_bots(interaction: discord.Interaction):
+    msg = f"**Hosted bots** (process RSS {process_rss_bytes() / 2**20:.1f} MiB)\n"
+    for name, bot in hosted_bots.items():
+        stats = bot_cache_stats(bot)
+        latency = "n/a" if stats["latency_ms"] is None else f"{stats['latency_ms']}ms"
+        msg += (
+            f"**{bot.user or name}**: {latency}, "
+            f"{stats['guilds']} guilds, {stats['members']} members, "
+            f"{stats['users']} users, {stats['messages']} messages, "
+            f"~{stats['approx_bytes'] / 2**10:.0f} KiB cached\n"
+        )
+    if log_forwarder:
+        stats = log_forwarder.stats()
+        msg += (
+            f"**Log webhook**: {stats['sent_lines']} lines in "
+            f"{stats['sent_messages']} messages, {stats['buffered']} buffered, "
+            f"{stats['dropped']} dropped, {stats['failures']} failed sends\n"
+        )
+    await interaction.response.send_message(msg, ephemeral=True)
+    log.debug(msg)
+
+
+# /stats storage
+@stats_group.command(
+    name="storage", description="Show how long points and config writes take."
+)
+async def stats_storage(interaction: discord.Interaction):
+    msg = "**Storage writes**\n"
+    for store in (points_store, config_store):
+        stats = store.stats()
+        last = stats["last_flush_ms"]
+        msg += (
+            f"**{stats['file']}** ({stats['serializer']}): {stats['flushes']} flushes for "
+            f"{stats['requested_writes']} changes ({stats['coalesced']} coalesced), "
+            f"avg {stats['avg_flush_ms']:.1f}ms, max {stats['max_flush_ms']:.1f}ms, "
+            f"last {'n/a' if last is None else f'{last:.1f}ms'}\n"
+        )
+    archive = points_archive.stats()
+    msg += (
+        f"**{archive['file']}**: {archive['users']} archived users, "
+        f"{archive['bytes'] / 2**10:.1f} KiB\n"
+    )
+    ledger = points_ledger.stats()
+    msg += (
+        f"**{ledger['file']}**: history for {ledger['users']} users, "
+        f"{ledger['bytes'] / 2**10:.1f} KiB\n"
+    )
+    await interaction.response.send_message(msg, ephemeral=True)
+    log.debug(msg)
+
+
+# /stats perf
+@stats_group.command(
+    name="perf", description="Show latency percentiles and I/O per command."
+)
+async def stats_perf(interaction: discord.Interaction):
+    if not command_stats:
+        await interaction.response.send_message(
+            "No commands recorded yet.", ephemeral=True
+        )
+        return
+
+    lines = [
+        f"{'command':<22}{'n':>6}{'p50':>7}{'p95':>7}{'p99':>7}{'max':>7}"
+        f"{'disk':>6}{'r/w':>8}{'api':>5}"
+    ]
+    for name, stats in sorted(
+        command_stats.items(), key=lambda x: x[1].count, reverse=True
+    ):
+        s = stats.summary()
+        lines.append(
+            f"{name[:21]:<22}{s['count']:>6}{s['p50_ms']:>7.0f}{s['p95_ms']:>7.0f}"
+            f"{s['p99_ms']:>7.0f}{s['max_ms']:>7.0f}{s['storage_ms']:>6.1f}"
+            f"{s['reads']:>4.1f}/{s['writes']:<3.1f}{s['api_calls']:>5.1f}"
+        )
+    msg = (
+        "**Command performance** (ms; disk = time in storage, "
+        "r/w and api are averages per call)\n```\n"
+    )
+    for line in lines:
+        if len(msg) + len(line) > 1990:
+            break
+        msg += line + "\n"
+    msg += "```"
     await interaction.response.send_message(msg, ephemeral=True)
-    print(msg)
+    log.debug(msg)
+
+
+# /stats profile
+@stats_group.command(
+    name="profile", description="Profile the bot for a while and list the hottest functions."
+)
+@privileged_check()
+@app_commands.describe(seconds="How long to profile for")
+async def stats_profile(
+    interaction: discord.Interaction,
+    seconds: app_commands.Range[int, 1, PROFILE_MAX_SECONDS],
+):
+    if profile_running():
+        await interaction.response.send_message(
+            "A profile is already running, try again when it finishes.", ephemeral=True
+        )
+        return
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    log.info("Profiling for %ss", seconds, extra=interaction_fields(interaction))
+    report, raw = await profile_loop(seconds)
+    await interaction.followup.send(
+        f"Profiled for {seconds}s. profile.prof opens with pstats or snakeviz.",
+        files=[
+            discord.File(io.BytesIO(report.encode()), filename="profile.txt"),
+            discord.File(io.BytesIO(raw), filename="profile.prof"),
+        ],
+        ephemeral=True,
+    )
+
+
+# /stats memory
+@stats_group.command(
+    name="memory", description="Report memory growth by allocation site and object type."
+)
+@privileged_check()
+@app_commands.describe(action="What to do, defaults to report")
+@app_commands.choices(
+    action=[
+        app_commands.Choice(name="report growth since the baseline", value="report"),
+        app_commands.Choice(name="take a new baseline", value="baseline"),
+        app_commands.Choice(name="stop tracing", value="stop"),
+    ]
+)
+async def stats_memory(interaction: discord.Interaction, action: str = "report"):
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    log.info("Memory %s", action, extra=interaction_fields(interaction))
+    if action == "stop":
+        memory_stop()
+        await interaction.followup.send("Stopped memory tracing.", ephemeral=True)
+        return
+    if action == "baseline":
+        await asyncio.to_thread(memory_baseline)
+        await interaction.followup.send(
+            "Took a new memory baseline; allocations are traced from now on.",
+            ephemeral=True,
+        )
+        return
+    report = await asyncio.to_thread(memory_report)
+    await interaction.followup.send(
+        f"Process RSS {process_rss_bytes() / 2**20:.1f} MiB.",
+        file=discord.File(io.BytesIO(report.encode()), filename="memory.txt"),
+        ephemeral=True,
+    )
 
 
 # /config values
@@ -553,8 +736,97 @@ async def config_values(
 ):
     set_value(type.value, value)
     msg = f"Set value of **{type.value}** to **{get_value(type.value)}**"
-    await interaction.response.send_message(msg)
-    print(msg)
+    await interaction.response.send_message(
+        f"{msg}\nUse `/config recompute` to re-value awards logged before this change."
+    )
+    log.debug(msg)
+
+
+# /config recompute
+@config_group.command(
+    name="recompute", description="Re-value every logged award at the current point values"
+)
+@privileged_check("config")
+async def config_recompute(interaction: discord.Interaction):
+    if recompute_lock.locked():
+        await interaction.response.send_message(
+            "Another recompute is waiting to be applied.", ephemeral=True
+        )
+        return
+    async with recompute_lock:
+        await recompute_points(interaction)
+
+
+async def recompute_points(interaction: discord.Interaction):
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        adjustments = await asyncio.to_thread(
+            replay_awards, points_ledger, dict(load_values())
+        )
+    except RuntimeError as e:
+        await interaction.edit_original_response(content=str(e))
+        return
+    if not adjustments:
+        await interaction.edit_original_response(
+            content="Every logged award already matches the current values."
+        )
+        return
+
+    points_data = load_points()
+    lines = []
+    largest = sorted(adjustments.items(), key=lambda x: abs(x[1]), reverse=True)
+    for uid, delta in largest[:RECOMPUTE_PREVIEW_SIZE]:
+        change = f"{'+' if delta > 0 else ''}{to_points(delta)}"
+        if uid in points_data:
+            balance = points_data[uid]["centipoints"]
+            lines.append(
+                f"<@{uid}>: {to_points(balance)} → {to_points(balance + delta)} ({change})"
+            )
+        else:
+            lines.append(f"<@{uid}>: {change} (archived, skipped)")
+    if len(adjustments) > RECOMPUTE_PREVIEW_SIZE:
+        lines.append(f"...and {len(adjustments) - RECOMPUTE_PREVIEW_SIZE} more")
+    total = sum(adjustments.values())
+    view = ConfirmLogView(label="Apply")
+    await interaction.edit_original_response(
+        content=(
+            f"Recomputing changes the points of **{len(adjustments)}** members "
+            f"by **{'+' if total > 0 else ''}{to_points(total)}** in total:\n"
+            + "\n".join(lines)
+        ),
+        view=view,
+        allowed_mentions=discord.AllowedMentions.none(),
+    )
+    await view.wait()
+
+    if not view.value:
+        await interaction.edit_original_response(
+            content="Timed out" if view.value is None else "Cancelled.", view=None
+        )
+        return
+
+    # Another process may have applied a recompute, or the values changed,
+    # since the preview; only apply what was shown if it's still what's owed
+    lock = file_lock(RECOMPUTE_LOCK_FILE)
+    await asyncio.to_thread(lock.__enter__)
+    try:
+        current = await asyncio.to_thread(
+            replay_awards, points_ledger, dict(load_values())
+        )
+        if current != adjustments:
+            await interaction.edit_original_response(
+                content="Points changed since the preview, nothing was applied. "
+                "Run the command again to see the new changes.",
+                view=None,
+            )
+            return
+        balances = adjust_points(adjustments, RECOMPUTE_KIND)
+    finally:
+        lock.__exit__(None, None, None)
+    await interaction.edit_original_response(
+        content=f"Recomputed the points of **{len(balances)}** members.", view=None
+    )
+    log.info("Recomputed the points of %d members", len(balances))
 
 
 # /config ranks
@@ -586,17 +858,17 @@ async def config_ranks_remove(interaction: discord.Interaction, rank: str):
     if rank == "__add_new__":
         msg = "No"
         await interaction.response.send_message(msg, ephemeral=True)
-        print(msg)
+        log.debug(msg)
         return
 
     if remove_rank(rank):
         msg = f"Removed rank **{rank}**"
         await interaction.response.send_message(msg)
-        print(msg)
+        log.debug(msg)
     else:
         msg = f"Rank **{rank}** not found."
         await interaction.response.send_message(msg, ephemeral=True)
-        print(msg)
+        log.debug(msg)
 
 
 @stats_group.command(name="ranks", description="List all ranks and their requirements")
@@ -605,7 +877,7 @@ async def config_ranks_list(interaction: discord.Interaction):
     if not ranks:
         msg = "No ranks configured yet."
         await interaction.response.send_message(msg, ephemeral=True)
-        print(msg)
+        log.debug(msg)
         return
 
     msg = "**Configured Ranks:**\n\n"
@@ -618,7 +890,7 @@ async def config_ranks_list(interaction: discord.Interaction):
         )
 
     await interaction.response.send_message(msg, ephemeral=True)
-    print(msg)
+    log.debug(msg)
 
 
 # /points check command
@@ -629,7 +901,7 @@ async def config_ranks_list(interaction: discord.Interaction):
 @promotion_check
 async def points_check(interaction: discord.Interaction, user: discord.User = None):
     target = user or interaction.user
-    points = get_points(target.id)
+    points = to_points(get_points(target.id))
     msg = ""
     if points >= 5000:
         msg = "🤑 "
@@ -639,6 +911,48 @@ async def points_check(interaction: discord.Interaction, user: discord.User = No
     return msg
 
 
+# /points history command
+@points_group.command(
+    name="history", description="Show the recent point changes of you or another member"
+)
+@app_commands.describe(user="User to show (optional)", page="Page, newest first")
+async def points_history(
+    interaction: discord.Interaction,
+    user: discord.User = None,
+    page: app_commands.Range[int, 1] = 1,
+):
+    target = user or interaction.user
+    total = points_ledger.count(target.id)
+    if total == 0:
+        await interaction.response.send_message(
+            f"No point changes recorded for **{target.mention}**.",
+            allowed_mentions=discord.AllowedMentions.none(),
+            ephemeral=True,
+        )
+        return
+    total_pages = (total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+    page = min(page, total_pages)
+    events = points_ledger.history(
+        target.id, HISTORY_PAGE_SIZE, skip=(page - 1) * HISTORY_PAGE_SIZE
+    )
+
+    msg = f"**Point history of {target.mention}** — page {page}/{total_pages}\n"
+    for e in events:
+        delta = to_points(e["d"])
+        line = f"<t:{e['t']}:f> **{'+' if e['d'] > 0 else ''}{delta}** → {to_points(e['b'])}"
+        if e.get("a"):
+            line += f" by <@{e['a']}>"
+        if e.get("r"):
+            line += f" — {e['r'][:60]}"
+        if e.get("s"):
+            line += f" ([source]({e['s']}))"
+        msg += line + "\n"
+    await interaction.response.send_message(
+        msg, allowed_mentions=discord.AllowedMentions.none(), ephemeral=True
+    )
+    log.debug(msg)
+
+
 # /points add command
 @points_group.command(name="add", description="Add points to a user")
 @privileged_check("logistics")
@@ -647,9 +961,9 @@ async def points_check(interaction: discord.Interaction, user: discord.User = No
 async def points_add(
     interaction: discord.Interaction, user: discord.User, amount: float
 ):
-    add_points(user.id, amount)
+    add_points(user.id, to_scaled(amount))
     amount = tidy_number(amount)
-    msg = f"Added **{amount}** points to **{user.mention}**, bringing their total to **{get_points(user.id)}**."
+    msg = f"Added **{amount}** points to **{user.mention}**, bringing their total to **{to_points(get_points(user.id))}**."
     return msg
 
 
@@ -662,13 +976,13 @@ async def points_add(
 async def points_subtract(
     interaction: discord.Interaction, user: discord.User, amount: float
 ):
-    add_points(user.id, -abs(amount))
+    add_points(user.id, -to_scaled(abs(amount)))
     amount = tidy_number(amount)
-    msg = f"Removed **{abs(amount)}** points from **{user.mention}**, bringing their total to **{get_points(user.id)}**."
+    msg = f"Removed **{abs(amount)}** points from **{user.mention}**, bringing their total to **{to_points(get_points(user.id))}**."
     await interaction.response.send_message(
         msg, allowed_mentions=discord.AllowedMentions.none()
     )
-    print(msg)
+    log.debug(msg)
 
 
 # /points set command
@@ -681,7 +995,7 @@ async def points_subtract(
 async def points_set(
     interaction: discord.Interaction, user: discord.User, amount: float
 ):
-    set_points(user.id, amount)
+    set_points(user.id, to_scaled(amount))
     amount = tidy_number(amount)
     msg = f"Set the points of **{user.mention}** to **{amount}**"
     return msg
@@ -690,12 +1004,13 @@ async def points_set(
 # /log rally command
 async def rally_logic(interaction, user, amount_attendees):
     if amount_attendees >= 5:
-        added = get_value("rallyX5")
+        award = {"rallyX5": 1}
     else:
-        added = get_value("rally")
-    add_points(user.id, added)
-    msg = f"Added **{added}** points to **{user.mention}** for representing ASOF at a SEA Rally"
-    msg += f"\nThey now have **{get_points(user.id)}** points"
+        award = {"rally": 1}
+    added = award_value(award)
+    add_points(user.id, added, award=award)
+    msg = f"Added **{to_points(added)}** points to **{user.mention}** for representing ASOF at a SEA Rally"
+    msg += f"\nThey now have **{to_points(get_points(user.id))}** points"
     return msg
 
 
@@ -721,9 +1036,10 @@ async def rally(
 async def log_leaderboard_logic(interaction, user, task, amount):
     if isinstance(task, str):
         task = SimpleNamespace(value=task, name=task.capitalize())
-    added = get_value(task.value) * amount
-    add_points(user.id, added)
-    msg = f"Added **{added}** points to **{user.mention}** for "
+    award = {task.value: amount}
+    added = award_value(award)
+    add_points(user.id, added, award=award)
+    msg = f"Added **{to_points(added)}** points to **{user.mention}** for "
     if task.value == "visitortransport":
         msg += f"transporting **{amount}** visitor{"" if amount == 1 else "1"}."
     elif task.value == "pizzadelivery":
@@ -736,7 +1052,7 @@ async def log_leaderboard_logic(interaction, user, task, amount):
         msg += f"training **{amount}** trainee{"" if amount == 1 else "s"}."
     elif task.value == "basecommander":
         msg += f"Eliminating **{amount}** Base Commander{"s" if amount > 1 else ""}."
-    msg += f"\nThey now have **{get_points(user.id)}** points"
+    msg += f"\nThey now have **{to_points(get_points(user.id))}** points"
     return msg
 
 
@@ -780,23 +1096,24 @@ async def event_logic(interaction, user, event_type, attendance_type):
             value=attendance_type, name=attendance_type.capitalize()
         )
 
-    added = get_value(event_type.value)
+    award = {event_type.value: 1}
     if not attendance_type.value == "attending":
-        added += get_value(attendance_type.value)
+        award[attendance_type.value] = 1
 
     member = interaction.guild.get_member(user.id)
 
     booster_bonus = 0
     if member and discord.utils.get(member.roles, id=booster_id):
-        booster_bonus = get_value("booster")
-        added += booster_bonus
-    add_points(user.id, added)
-    msg = f"Added **{added}** points to **{user.mention}** for {attendance_type.name.lower().replace(" ", "-")} a **{event_type.name}**."
+        booster_bonus = get_scaled_value("booster")
+        award["booster"] = 1
+    added = award_value(award)
+    add_points(user.id, added, award=award)
+    msg = f"Added **{to_points(added)}** points to **{user.mention}** for {attendance_type.name.lower().replace(" ", "-")} a **{event_type.name}**."
 
     if booster_bonus > 0:  # Checks if member is a server booster
-        msg += f"\n<:booster_icon:1425732545986822164> That includes an extra **{booster_bonus}** points for being a **Server Booster**! Thank you for supporting the division!"
+        msg += f"\n<:booster_icon:1425732545986822164> That includes an extra **{to_points(booster_bonus)}** points for being a **Server Booster**! Thank you for supporting the division!"
 
-    msg += f"\nThey now have **{get_points(user.id)}** points."
+    msg += f"\nThey now have **{to_points(get_points(user.id))}** points."
 
     return msg
 
@@ -840,12 +1157,13 @@ async def event(
 # Log ad command
 async def ad_logic(interaction, user, amount):
     if amount == 3 or amount == 6:
-        added = get_value("adX3")
+        award = {"adX3": 1}
     else:
-        added = get_value("ad")
-    add_points(user.id, added)
-    msg = f"Added **{added}** points to **{user.mention}** for posting **{amount}** ads in one day"
-    msg += f"\nThey now have **{get_points(user.id)}** points"
+        award = {"ad": 1}
+    added = award_value(award)
+    add_points(user.id, added, award=award)
+    msg = f"Added **{to_points(added)}** points to **{user.mention}** for posting **{amount}** ads in one day"
+    msg += f"\nThey now have **{to_points(get_points(user.id))}** points"
     return msg
 
 
@@ -865,10 +1183,11 @@ async def log_ad(interaction: discord.Interaction, user: discord.User, amount: i
 
 # /log recruitment command
 async def recruitment_logic(interaction, user, amount):
-    added = get_value("recruitment") * amount
-    add_points(user.id, added)
-    msg = f"Added **{added}** points to **{user.mention}** for **recruiting** **{amount}** members.\n"
-    msg += f" They now have **{get_points(user.id)}** points."
+    award = {"recruitment": amount}
+    added = award_value(award)
+    add_points(user.id, added, award=award)
+    msg = f"Added **{to_points(added)}** points to **{user.mention}** for **recruiting** **{amount}** members.\n"
+    msg += f" They now have **{to_points(get_points(user.id))}** points."
     return msg
 
 
@@ -895,20 +1214,23 @@ LOG AUTO
 
 
 class ConfirmLogView(discord.ui.View):
-    def __init__(self):
+    def __init__(self, label: str = "Confirm log"):
         super().__init__(timeout=60)
         self.value = None  # stores the button result
+        self.confirm.label = label
 
     @discord.ui.button(label="Confirm log", style=discord.ButtonStyle.green, emoji="✅")
     async def confirm(
         self, interaction: discord.Interaction, button: discord.ui.Button
     ):
         self.value = True
+        await interaction.response.defer()
         self.stop()
 
     @discord.ui.button(label="Cancel", style=discord.ButtonStyle.red, emoji="❌")
     async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
         self.value = False
+        await interaction.response.defer()
         self.stop()
 
 
@@ -929,8 +1251,9 @@ async def log_auto(interaction: discord.Interaction, link: str):
             int(parts[-2]),
             int(parts[-1]),
         )
-        channel = await bot.fetch_channel(channel_id)
+        channel = await interaction.client.fetch_channel(channel_id)
         message = await channel.fetch_message(message_id)
+        update_change_context(source=message.jump_url)
     except Exception as e:
         await interaction.edit_original_response(content=f"Invalid message link: {e}")
         await asyncio.sleep(5)
@@ -976,17 +1299,17 @@ async def log_auto(interaction: discord.Interaction, link: str):
         prompts[log_type + "_footer"],
     )
     prompt = "\n".join(prompt)
-    client = genai.Client(api_key=os.getenv("GENAI_API_KEY"))
+    client = get_genai_client()
 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash-lite",
-        config=types.GenerateContentConfig(system_instruction=prompts["header"]),
-        contents=prompt,
-    )
+    with time_gemini_call():
+        response = client.models.generate_content(
+            model="gemini-2.5-flash-lite",
+            config=types.GenerateContentConfig(system_instruction=prompts["header"]),
+            contents=prompt,
+        )
 
-    print(response.text)
+    log.debug("Gemini output: %s", response.text)
     aiOutput = response.text.lower().splitlines()
-    print(aiOutput)
     view = ConfirmLogView()
     await interaction.followup.send(
         f"Confirm this data?\n>>> {response.text}", view=view, ephemeral=True
@@ -1024,7 +1347,6 @@ async def log_auto(interaction: discord.Interaction, link: str):
                 ).group(1)
 
                 attendance_type += "ing"
-                print(attendance_type)
                 msg += f"\n{await event_logic(interaction, user=user, event_type=event_type, attendance_type=attendance_type)}"
                 msg += await promotion_check_2(
                     interaction, user=user, suppress_send=True
@@ -1064,7 +1386,7 @@ async def log_auto(interaction: discord.Interaction, link: str):
                 msg += f"\n{await rally_logic(interaction, user=user, amount_attendees=amount_attendees)}"
             else:
                 continue
-            print(aiOutput[i])
+            log.debug("Logged AI line: %s", aiOutput[i])
             i += 1
         await interaction.edit_original_response(content=f"Logged successfully\n{msg}")
     else:
@@ -1079,117 +1401,479 @@ POINTS LEADERBOARD
 """
 
 
+@functools.lru_cache(maxsize=256)
+def page_suggestions(total_pages: int, current: str) -> list[app_commands.Choice]:
+    suggestions = []
+    for i in range(1, total_pages + 1):
+        if len(suggestions) == AUTOCOMPLETE_LIMIT - 1:
+            break
+        if current in str(i):
+            suggestions.append(app_commands.Choice(name=str(i), value=str(i)))
+    if current in "all":
+        suggestions.append(app_commands.Choice(name="all", value="all"))
+    return suggestions
+
+
 # Autocomplete function
 async def leaderboard_page_autocomplete(interaction: discord.Interaction, current: str):
-    points_data = load_points()
-    per_page = 10
-    total_pages = (len(points_data) + per_page - 1) // per_page or 1
+    period = getattr(interaction.namespace, "period", None) or "all"
+    # The same cached ranking the leaderboard pages come from
+    ranking = leaderboard_ranking(interaction.guild, period)
+    total_pages = max(leaderboard_page_count(len(ranking)), 1)
+    return page_suggestions(total_pages, current.lower().strip())
 
-    suggestions = [
-        app_commands.Choice(name=str(i), value=str(i))
-        for i in range(1, total_pages + 1)
-    ]
-    suggestions.append(app_commands.Choice(name="all", value="all"))
 
-    return [s for s in suggestions if current.lower() in s.name.lower()]
+LEADERBOARD_PERIODS = [
+    app_commands.Choice(name="All time", value="all"),
+    app_commands.Choice(name="This week", value="week"),
+    app_commands.Choice(name="This month", value="month"),
+    app_commands.Choice(name="This season", value="season"),
+]
 
 
-# /leaderboard command
-@bot.tree.command(
-    name="leaderboard", description="Shows how many points people have on a leaderboard"
-)
-@app_commands.describe(page="Select a page number or 'all'")
-@app_commands.autocomplete(page=leaderboard_page_autocomplete)
-async def leaderboard(interaction: discord.Interaction, page: str):
-    points_data = load_points()
-    guild = interaction.guild
-    members = {str(m.id): m for m in guild.members if not m.bot}
+def period_start(period: str) -> date:
+    """First day of the current week, month or season (calendar quarter)."""
+    today = date.today()
+    if period == "week":
+        return today - timedelta(days=today.weekday())
+    if period == "month":
+        return today.replace(day=1)
+    return today.replace(month=(today.month - 1) // 3 * 3 + 1, day=1)
+
 
+def rank_leaderboard(points_data: dict, members) -> list[tuple[int, int]]:
+    """(user id, centipoints) of every user id in `members`, highest first."""
     leaderboard_list = [
-        (int(uid), info.get("points", 0))
+        (int(uid), info.get("centipoints", 0))
         for uid, info in points_data.items()
         if uid in members
     ]
     leaderboard_list.sort(key=lambda x: x[1], reverse=True)
+    return leaderboard_list
 
-    if len(leaderboard_list) == 0:
-        await interaction.response.send_message("No one is on the leaderboard yet.")
-        return
 
-    per_page = 10
-    total_pages = (len(leaderboard_list) + per_page - 1) // per_page
+def leaderboard_page_count(entries: int) -> int:
+    return (entries + LEADERBOARD_PAGE_SIZE - 1) // LEADERBOARD_PAGE_SIZE
 
-    # Handle 'all' mode
-    if page.lower() == "all":
-        display_list = leaderboard_list
-        ephemeral = True
-        page_num = 1
-    else:
+
+def leaderboard_line(rank: int, user_id: int, points: int) -> str:
+    return f"**#{rank}** — <@{user_id}>: {to_points(points)} points"
+
+
+def render_leaderboard(ranking: list, page: str, period: str = None):
+    """Returns the message for `page` and whether it's ephemeral."""
+    if len(ranking) == 0:
+        if period:
+            return f"No one has gained points this {period} yet.", False
+        return "No one is on the leaderboard yet.", False
+
+    per_page = LEADERBOARD_PAGE_SIZE
+    total_pages = leaderboard_page_count(len(ranking))
+
+    try:
+        page_num = int(page)
+        if page_num < 1 or page_num > total_pages:
+            return (
+                f"Invalid page number. There {'are only **'+str(total_pages)+'** pages' if total_pages > 1 else 'is only **1** page'}."
+            ), True
+    except ValueError:
+        return (
+            f"Page must be {'a number (1 to '+str(total_pages)+')' if total_pages > 1 else '1'} or `all`."
+        ), True
+
+    start_index = (page_num - 1) * per_page
+    display_list = ranking[start_index : start_index + per_page]
+
+    period_name = f" (this {period})" if period else ""
+    lines = [f"🏆 Leaderboard{period_name} — Page {page_num}/{total_pages}"]
+    for rank, (user_id, points) in enumerate(display_list, start=1 + start_index):
+        lines.append(leaderboard_line(rank, user_id, points))
+    return "\n".join(lines), False
+
+
+def _leaderboard_cache(guild: discord.Guild):
+    """
+    (rankings by period, rendered pages) for `guild`, emptied when points or
+    membership change. The day is part of the key so windowed boards roll over.
+    """
+    load_points()  # picks up other processes' changes
+    versions = (
+        points_store.version,
+        member_registry.versions[guild.id],
+        date.today(),
+    )
+    cached = leaderboard_pages.get(guild.id)
+    if (
+        cached is None
+        or cached[0] != versions
+        or len(cached[2]) >= LEADERBOARD_CACHE_PAGES
+    ):
+        cached = leaderboard_pages[guild.id] = (versions, {}, {})
+    return cached[1], cached[2]
+
+
+def leaderboard_ranking(guild: discord.Guild, period: str = "all") -> list:
+    rankings, _ = _leaderboard_cache(guild)
+    if period not in rankings:
+        members = member_registry.members(guild)
+        if period == "all":
+            rankings[period] = rank_leaderboard(load_points(), members)
+        else:
+            # Summed from day buckets rather than replaying the ledger
+            totals = daily_totals.totals_since(period_start(period))
+            rankings[period] = rank_leaderboard(
+                {uid: {"centipoints": total} for uid, total in totals.items()}, members
+            )
+    return rankings[period]
+
+
+def cached_leaderboard(guild: discord.Guild, page: str, period: str = "all"):
+    """render_leaderboard for `guild`, reusing pages until points or membership change."""
+    ranking = leaderboard_ranking(guild, period)
+    _, pages = _leaderboard_cache(guild)
+    key = (page.lower(), period)
+    if key not in pages:
+        pages[key] = render_leaderboard(ranking, page, None if period == "all" else period)
+    return pages[key]
+
+
+def leaderboard_message(guild: discord.Guild, page: int, period: str = "all"):
+    """Content and pager for one page, clamped to the pages there are now."""
+    ranking = leaderboard_ranking(guild, period)
+    total_pages = max(leaderboard_page_count(len(ranking)), 1)
+    page = min(max(page, 1), total_pages)
+    content, _ = cached_leaderboard(guild, str(page), period)
+    if total_pages == 1:
+        return content, None
+    view = discord.ui.View(timeout=None)
+    buttons = (
+        ("first", "⏮"),
+        ("prev", "◀"),
+        ("jump", f"{page}/{total_pages}"),
+        ("next", "▶"),
+        ("last", "⏭"),
+    )
+    for action, label in buttons:
+        disabled = (action in ("first", "prev") and page == 1) or (
+            action in ("next", "last") and page == total_pages
+        )
+        view.add_item(LeaderboardButton(action, period, page, label, disabled))
+    return content, view
+
+
+async def show_leaderboard_page(interaction: discord.Interaction, page: int, period: str):
+    content, view = leaderboard_message(interaction.guild, page, period)
+    await interaction.response.edit_message(
+        content=content, view=view, allowed_mentions=discord.AllowedMentions.none()
+    )
+
+
+class LeaderboardJumpModal(discord.ui.Modal, title="Go to page"):
+    page = discord.ui.TextInput(label="Page", max_length=6)
+
+    def __init__(self, period: str):
+        super().__init__()
+        self.period = period
+
+    async def on_submit(self, interaction: discord.Interaction):
         try:
-            page_num = int(page)
-            if page_num < 1 or page_num > total_pages:
-                await interaction.response.send_message(
-                    f"Invalid page number. There {'are only **'+str(total_pages)+'** pages' if total_pages > 1 else 'is only **1** page'}.",
-                    ephemeral=True,
-                )
-                return
+            page = int(self.page.value)
         except ValueError:
             await interaction.response.send_message(
-                f"Page must be {'a number (1 to '+str(total_pages)+')' if total_pages > 1 else '1'} or `all`.",
-                ephemeral=True,
+                "Page must be a number.", ephemeral=True
             )
             return
+        await show_leaderboard_page(interaction, page, self.period)
 
-        start_index = (page_num - 1) * per_page
-        end_index = start_index + per_page
-        display_list = leaderboard_list[start_index:end_index]
-        ephemeral = False
 
-    # Build leaderboard text
-    lines = []
-    rank_offset = 0 if page.lower() == "all" else (per_page * (page_num - 1))
-    for rank, (user_id, points) in enumerate(display_list, start=1 + rank_offset):
-        member = members.get(str(user_id))
-        name = member.mention if member else f"Unknown User ({user_id})"
-        points_display = int(points) if float(points).is_integer() else points
-        lines.append(f"**#{rank}** — {name}: {points_display} points")
+class LeaderboardButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r"leaderboard:(?P<action>\w+):(?P<period>\w+):(?P<page>\d+)",
+):
+    """
+    Pager button on a leaderboard message. The page it was showing is kept
+    in the custom id, so the buttons keep working after a restart.
+    """
+
+    def __init__(
+        self, action: str, period: str, page: int, label: str = None, disabled=False
+    ):
+        style = discord.ButtonStyle.secondary
+        if action == "jump":
+            style = discord.ButtonStyle.primary
+        super().__init__(
+            discord.ui.Button(
+                label=label or action,
+                style=style,
+                custom_id=f"leaderboard:{action}:{period}:{page}",
+                disabled=disabled,
+            )
+        )
+        self.action = action
+        self.period = period
+        self.page = page
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["action"], match["period"], int(match["page"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        # Edits to one message are what Discord rate limits, so presses over
+        # the limit are acknowledged without touching the message
+        if leaderboard_button_cooldown.get_bucket(interaction).update_rate_limit():
+            await interaction.response.defer()
+            return
+        if self.action == "jump":
+            await interaction.response.send_modal(LeaderboardJumpModal(self.period))
+            return
+        page = {
+            "first": 1,
+            "prev": self.page - 1,
+            "next": self.page + 1,
+            "last": leaderboard_page_count(
+                len(leaderboard_ranking(interaction.guild, self.period))
+            ),
+        }[self.action]
+        await show_leaderboard_page(interaction, page, self.period)
+
+
+def live_leaderboard_content(ranking: list, top: int, period: str = "all") -> str:
+    period_name = "" if period == "all" else f" (this {period})"
+    lines = [f"🏆 Live Leaderboard{period_name} — Top {top}"]
+    for rank, (user_id, points) in enumerate(ranking[:top], start=1):
+        lines.append(leaderboard_line(rank, user_id, points))
+    if not ranking:
+        lines.append("No one is on the leaderboard yet.")
+    lines.append(f"-# Updated <t:{int(time.time())}:R>")
+    return "\n".join(lines)
+
+
+async def refresh_live_leaderboards():
+    """Edits each live leaderboard whose top places changed, at most once per its interval."""
+    for channel_id, board in list(load_live_leaderboards().items()):
+        shown, edited_at = live_leaderboard_state.get(channel_id, (None, -math.inf))
+        if time.monotonic() - edited_at < board["interval"]:
+            continue
+        for bot in hosted_bots.values():
+            # Only the bot that posted the message can edit it; boards saved
+            # before bot_id was recorded go to the first bot that sees them
+            if bot.user is None or board.get("bot_id", bot.user.id) != bot.user.id:
+                continue
+            if channel := bot.get_channel(int(channel_id)):
+                break
+        else:
+            continue  # the posting bot isn't in this process or can't see it
+
+        ranking = leaderboard_ranking(channel.guild, board["period"])
+        top = ranking[: board["top"]]
+        if top == shown:
+            continue
+        try:
+            await channel.get_partial_message(board["message_id"]).edit(
+                content=live_leaderboard_content(ranking, board["top"], board["period"]),
+                allowed_mentions=discord.AllowedMentions.none(),
+            )
+        except discord.NotFound:
+            remove_live_leaderboard(int(channel_id))
+            live_leaderboard_state.pop(channel_id, None)
+            log.warning("Live leaderboard in #%s was deleted, no longer updating it", channel)
+            continue
+        except discord.HTTPException as e:
+            log.warning("Failed to update the live leaderboard in #%s: %s", channel, e)
+            continue
+        live_leaderboard_state[channel_id] = (top, time.monotonic())
+
+
+async def run_live_leaderboards():
+    while True:
+        try:
+            await refresh_live_leaderboards()
+        except Exception:
+            log.exception("Failed to refresh live leaderboards")
+        await asyncio.sleep(LIVE_LEADERBOARD_TICK)
+
+
+# /config live_leaderboard
+@config_group.command(
+    name="live_leaderboard",
+    description="Post a leaderboard in a channel that keeps itself up to date",
+)
+@privileged_check("config")
+@app_commands.describe(
+    channel="Channel to post the leaderboard in",
+    period="Rank by points gained this week, month or season instead of all time",
+    top="How many places to show",
+    interval="Minimum minutes between edits",
+    stop="Stop updating the leaderboard in this channel instead",
+)
+@app_commands.choices(period=LEADERBOARD_PERIODS)
+async def config_live_leaderboard(
+    interaction: discord.Interaction,
+    channel: discord.TextChannel,
+    period: str = "all",
+    top: app_commands.Range[int, 1, 25] = 10,
+    interval: app_commands.Range[int, 1, 1440] = 5,
+    stop: bool = False,
+):
+    if stop:
+        board = remove_live_leaderboard(channel.id)
+        live_leaderboard_state.pop(str(channel.id), None)
+        if board is None:
+            msg = f"There's no live leaderboard in {channel.mention}."
+        else:
+            msg = f"Stopped updating the live leaderboard in {channel.mention}."
+        await interaction.response.send_message(msg, ephemeral=True)
+        return
 
+    # Posting and pinning can take longer than an interaction may go unanswered
+    await interaction.response.defer(ephemeral=True)
+    ranking = leaderboard_ranking(interaction.guild, period)
+    try:
+        message = await channel.send(
+            live_leaderboard_content(ranking, top, period),
+            allowed_mentions=discord.AllowedMentions.none(),
+        )
+    except discord.Forbidden:
+        await interaction.followup.send(
+            f"I'm not allowed to post in {channel.mention}.", ephemeral=True
+        )
+        return
+    except discord.HTTPException as e:
+        log.warning("Could not post the live leaderboard in #%s: %s", channel, e)
+        await interaction.followup.send(
+            f"Couldn't post in {channel.mention}, try again later.", ephemeral=True
+        )
+        return
+    try:
+        await message.pin()
+    except discord.HTTPException as e:
+        log.warning("Could not pin the live leaderboard in #%s: %s", channel, e)
+    previous = set_live_leaderboard(
+        channel.id, message.id, message.author.id, period, top, interval * 60
+    )
+    live_leaderboard_state[str(channel.id)] = (ranking[:top], time.monotonic())
+    if previous:
+        with contextlib.suppress(discord.HTTPException):
+            await channel.get_partial_message(previous["message_id"]).unpin()
+
+    await interaction.followup.send(
+        f"Posted a live leaderboard in {channel.mention}. It's edited when the top "
+        f"{top} change, at most every {interval} minute{"" if interval == 1 else "s"}.",
+        ephemeral=True,
+    )
+    log.info("Live leaderboard started in #%s", channel)
+
+
+# /leaderboard command
+@app_commands.command(
+    name="leaderboard", description="Shows how many points people have on a leaderboard"
+)
+@app_commands.describe(
+    page="Select a page number or 'all'",
+    period="Rank by points gained this week, month or season instead of all time",
+)
+@app_commands.autocomplete(page=leaderboard_page_autocomplete)
+@app_commands.choices(period=LEADERBOARD_PERIODS)
+async def leaderboard(interaction: discord.Interaction, page: str, period: str = "all"):
+    # 'all' opens the pager privately instead of sending the whole board
     if page.lower() == "all":
-        title = f"🏆 Full Leaderboard — {len(leaderboard_list)} players"
+        content, view = leaderboard_message(interaction.guild, 1, period)
+        ephemeral = True
     else:
-        title = f"🏆 Leaderboard — Page {page_num}/{total_pages}"
+        content, ephemeral = cached_leaderboard(interaction.guild, page, period)
+        view = None
+        # An empty board isn't ephemeral whatever the page was, so check it's a number
+        if not ephemeral and page.strip().isdecimal():
+            content, view = leaderboard_message(interaction.guild, int(page), period)
 
-    # Split message into chunks to respect Discord’s 2000-character limit
-    max_length = 1900
-    message = f"{title}\n"
-    chunks = []
-
-    for line in lines:
-        if len(message) + len(line) + 1 > max_length:
-            chunks.append(message)
-            message = ""
-        message += line + "\n"
-    if message:
-        chunks.append(message)
-
-    # Send first chunk as initial response
     await interaction.response.send_message(
-        chunks[0],
+        content,
         allowed_mentions=discord.AllowedMentions.none(),
         ephemeral=ephemeral,
+        **({"view": view} if view else {}),
     )
 
-    # Send remaining chunks as followups
-    for chunk in chunks[1:]:
-        await interaction.followup.send(
-            chunk,
-            allowed_mentions=discord.AllowedMentions.none(),
-            ephemeral=ephemeral,
+
+"""
+LAUNCHER
+"""
+
+
+def create_bot(name: str) -> commands.Bot:
+    bot = commands.Bot(command_prefix="/", intents=intents, tree_cls=ASOFCommandTree)
+    for command in (points_group, log_group, stats_group, config_group, leaderboard):
+        bot.tree.add_command(command)
+    bot.add_listener(functools.partial(on_ready, bot), "on_ready")
+    bot.add_listener(on_app_command_completion)
+    instrument_api_calls(bot)
+    bot.add_listener(on_member_join)
+    bot.add_listener(on_member_remove)
+    bot.add_listener(on_member_update)
+    bot.add_listener(on_guild_remove)
+    bot.add_dynamic_items(LeaderboardButton)
+    hosted_bots[name] = bot
+    return bot
+
+
+register_gauge(
+    "asof_gateway_latency_seconds",
+    "Heartbeat latency of each hosted bot's gateway connection.",
+    lambda: [
+        ({"bot": name}, bot.latency)
+        for name, bot in hosted_bots.items()
+        if not math.isnan(bot.latency)
+    ],
+)
+
+
+async def run_bots(token_env_vars: list[str]):
+    tokens = {name: os.getenv(name) for name in token_env_vars}
+    missing = [name for name, token in tokens.items() if not token]
+    if missing:
+        raise SystemExit(f"No token set for {', '.join(missing)}")
+
+    # Every bot shares one event loop, one points/config store and one
+    # Gemini client instead of running as separate interpreters.
+    async with contextlib.AsyncExitStack() as stack:
+        if log_forwarder:
+            log_forwarder.start()
+            stack.push_async_callback(log_forwarder.aclose)
+        loop_lag.start()
+
+        # Departed members are removed as they expire rather than by a periodic scan
+        departures.load(load_points())
+        expiry_task = asyncio.create_task(departures.run(expire_departed))
+        stack.callback(expiry_task.cancel)
+        live_task = asyncio.create_task(run_live_leaderboards())
+        stack.callback(live_task.cancel)
+
+        metrics_port = os.getenv("METRICS_PORT")
+        if metrics_port:
+            runner = await start_metrics_server(int(metrics_port))
+            stack.push_async_callback(runner.cleanup)
+            log.info("Serving metrics on 127.0.0.1:%s/metrics", metrics_port)
+
+        starts = []
+        for name, token in tokens.items():
+            bot = await stack.enter_async_context(create_bot(name))
+            starts.append(bot.start(token))
+
+        # Close cleanly on SIGTERM so queued storage writes are flushed at exit
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(
+            signal.SIGTERM,
+            lambda: [loop.create_task(bot.close()) for bot in hosted_bots.values()],
         )
+        await asyncio.gather(*starts)
 
 
 """
 RUN BOT
 """
 
-bot.run(os.getenv("BOT_TOKEN"))
+if __name__ == "__main__":
+    log_forwarder = setup_logging(webhook_url=os.getenv("DISCORD_WEBHOOK_URL"))
+    try:
+        asyncio.run(run_bots(sys.argv[1:] or BOT_TOKEN_ENV_VARS))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,64 @@
+"""
+ASOF BENCHMARKS
+
+Run from the repository root, e.g. `python -m benchmarks.serializers`.
+"""
+
+import contextlib
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOT_FILE = os.path.join(REPO_DIR, "BotV1,5.py")
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def load_bot():
+    """Import BotV1,5.py, whose name isn't a valid module name, as `asof_bot`."""
+    if "asof_bot" in sys.modules:
+        return sys.modules["asof_bot"]
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    spec = importlib.util.spec_from_file_location("asof_bot", BOT_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["asof_bot"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextlib.contextmanager
+def in_temp_dir():
+    """The stores use paths relative to the working directory, so run there."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            yield directory
+        finally:
+            os.chdir(cwd)
@@ -0,0 +1,169 @@
+"""
+FAKE DISCORD OBJECTS
+
+In-memory stand-ins for the parts of discord.Interaction, Guild and Member
+the command handlers touch. Responses are recorded instead of sent, and can
+be delayed to mimic Discord's API latency.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import discord
+from discord import app_commands
+
+
+class FakeRole:
+    def __init__(self, role_id: int, name: str = None):
+        self.id = role_id
+        self.name = name or str(role_id)
+        self.mention = f"<@&{role_id}>"
+
+
+class FakeMember(discord.Member):
+    """
+    Passes isinstance(x, discord.Member) like the real thing, so
+    promotion_check and privileged_check take the same paths they do live.
+    The class attributes shadow Member's properties with plain values.
+    """
+
+    id = name = display_name = mention = bot = roles = guild = None
+
+    def __new__(cls, *args, **kwargs):
+        return object.__new__(cls)
+
+    def __init__(self, member_id: int, roles=(), bot=False, guild=None):
+        self.id = int(member_id)
+        self.name = self.display_name = f"member{member_id}"
+        self.mention = f"<@{member_id}>"
+        self.bot = bot
+        self.roles = [FakeRole(r) if isinstance(r, int) else r for r in roles]
+        self.guild = guild
+
+    def __repr__(self):
+        return f"<FakeMember id={self.id}>"
+
+    def __eq__(self, other):
+        return isinstance(other, discord.abc.Snowflake) and other.id == self.id
+
+    def __hash__(self):
+        return self.id >> 22
+
+
+class FakeGuild:
+    def __init__(self, members, guild_id=1):
+        self.id = guild_id
+        self.name = "Synthetic Guild"
+        self._members = {}
+        for member in members:
+            self.add_member(member)
+
+    def add_member(self, member):
+        member.guild = self
+        self._members[member.id] = member
+
+    def remove_member(self, member_id):
+        return self._members.pop(member_id, None)
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    @property
+    def member_count(self):
+        return len(self._members)
+
+    def get_member(self, member_id):
+        return self._members.get(member_id)
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def send_message(self, content=None, **kwargs):
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        self._done = True
+        await self._interaction._api_call("send_message", content, kwargs)
+
+    async def defer(self, **kwargs):
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        self._done = True
+        await self._interaction._api_call("defer", None, kwargs)
+
+    async def edit_message(self, content=None, **kwargs):
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        self._done = True
+        await self._interaction._api_call("edit_message", content, kwargs)
+
+    async def send_modal(self, modal):
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        self._done = True
+        await self._interaction._api_call("modal", None, {"modal": modal})
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self._interaction._api_call("followup", content, kwargs)
+
+
+class FakeNamespace(SimpleNamespace):
+    """Iterates as (name, value) pairs, with choices reduced to their value."""
+
+    def __init__(self, options):
+        super().__init__(
+            **{
+                name: value.value if isinstance(value, app_commands.Choice) else value
+                for name, value in options.items()
+            }
+        )
+
+    def __iter__(self):
+        return iter(vars(self).items())
+
+
+class FakeInteraction:
+    """
+    One invocation of `command` by `user`. Every response, followup and
+    edit is appended to `calls` as (kind, content, kwargs).
+    """
+
+    def __init__(
+        self, guild, user, command=None, namespace=None, api_latency=0.0, message=None
+    ):
+        self.id = id(self)
+        self.guild = guild
+        self.guild_id = guild.id if guild else None
+        self.channel_id = 2
+        self.message = message  # the message a button was pressed on
+        self.user = user
+        self.command = command
+        self.namespace = FakeNamespace(namespace or {})
+        self.extras = {}
+        self.client = SimpleNamespace(latency=0.05)
+        self.api_latency = api_latency
+        self.calls = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def _api_call(self, kind, content, kwargs):
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+        self.calls.append((kind, content, kwargs))
+
+    async def edit_original_response(self, **kwargs):
+        await self._api_call("edit", kwargs.get("content"), kwargs)
+
+    async def delete_original_response(self):
+        await self._api_call("delete", None, {})
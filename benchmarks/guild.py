@@ -0,0 +1,165 @@
+"""
+SYNTHETIC GUILD BENCHMARK
+
+Times the points, promotion, leaderboard and departure expiry paths of BotV1,5.py
+against synthetic points.json and config.json files. Use --json output
+from two checkouts to compare bot versions.
+
+    python -m benchmarks.guild [--sizes 1000 10000] [--repeat 5] [--calls 1000] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import time
+
+from benchmarks import git_commit, in_temp_dir, load_bot
+from benchmarks.fakes import FakeGuild, FakeInteraction
+from benchmarks.synthetic import SIZES, make_config, make_members, make_points
+
+
+async def time_calls(func, calls, repeat, setup=None):
+    """Median seconds per call of `func(i)` over `calls` calls."""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for i in range(calls):
+            result = func(i)
+            if asyncio.iscoroutine(result):
+                await result
+        timings.append((time.perf_counter() - start) / calls)
+    return statistics.median(timings)
+
+
+async def bench_size(bot, storage, size, calls, repeat):
+    points = make_points(size)
+    config = make_config()
+    members = make_members(points, config)
+    member_map = {str(m.id): m for m in members if not m.bot}
+    guild = FakeGuild(members)
+    rng = random.Random(size)
+    uids = [int(uid) for uid in rng.choices(list(points), k=calls)]
+    sample = rng.choices(list(member_map.values()), k=calls)
+    pages = [str(rng.randint(1, max(len(member_map) // 10, 1))) for _ in range(calls)]
+
+    def reset():
+        storage.points_store.replace(storage._snapshot_points(points))
+        storage.config_store.replace(make_config())
+        storage.store_writer.flush_all()
+
+    def reset_departures():
+        reset()
+        bot.departures.load(storage.load_points())
+
+    def uncached(func):
+        # Drops the guild's rankings and pages first, as a point change would
+        def call(i):
+            bot.leaderboard_pages.clear()
+            return func(i)
+
+        return call
+
+    def dirty_all():
+        with storage.points_store.transaction():
+            pass
+
+    reset()
+    results = {
+        "add_points": await time_calls(
+            lambda i: storage.add_points(uids[i], 100), calls, repeat
+        ),
+        "get_points": await time_calls(lambda i: storage.get_points(uids[i]), calls, repeat),
+        "check_for_promotion": await time_calls(
+            lambda i: bot.check_for_promotion(sample[i]), calls, repeat
+        ),
+        "leaderboard_page": await time_calls(
+            uncached(lambda i: bot.leaderboard_message(guild, int(pages[i]))),
+            min(calls, 100),
+            repeat,
+        ),
+        "leaderboard_cached": await time_calls(
+            lambda i: bot.cached_leaderboard(guild, pages[i % 10]), calls, repeat
+        ),
+        "page_autocomplete": await time_calls(
+            lambda i: bot.leaderboard_page_autocomplete(
+                FakeInteraction(guild, sample[i]), pages[i][:2]
+            ),
+            calls,
+            repeat,
+        ),
+        "leaderboard_ranking": await time_calls(
+            uncached(lambda i: bot.leaderboard_ranking(guild, "all")),
+            min(calls, 100),
+            repeat,
+        ),
+        "period_totals": await time_calls(
+            lambda i: storage.daily_totals.totals_since(bot.period_start("week")),
+            min(calls, 100),
+            repeat,
+        ),
+        "flush_points": await time_calls(
+            lambda i: storage.store_writer.flush_all(), 1, repeat, setup=dirty_all
+        ),
+        "load_departures": await time_calls(
+            lambda i: bot.departures.load(storage.load_points()), 1, repeat
+        ),
+        "expire_departed": await time_calls(
+            lambda i: bot.expire_departed(bot.departures.pop_due()),
+            1,
+            repeat,
+            setup=reset_departures,
+        ),
+    }
+    storage.store_writer.flush_all()
+    return [
+        {"users": size, "operation": name, "us_per_call": seconds * 1e6}
+        for name, seconds in results.items()
+    ]
+
+
+async def run(sizes, calls, repeat):
+    results = []
+    with in_temp_dir():
+        bot = load_bot()
+        import storage
+
+        for size in sizes:
+            results += await bench_size(bot, storage, size, calls, repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--calls", type=int, default=1000, help="calls per timing")
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.sizes, args.calls, args.repeat))
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "commit": git_commit(),
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": results,
+                },
+                indent=4,
+            )
+        )
+        return
+
+    print(f"{'users':>8} {'operation':<24} {'µs/call':>12}")
+    for r in results:
+        print(f"{r['users']:>8} {r['operation']:<24} {r['us_per_call']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
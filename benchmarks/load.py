@@ -0,0 +1,187 @@
+"""
+COMMAND LOAD TEST
+
+Fires concurrent invocations of the real command handlers, through their
+privileged_check and promotion_check decorators, at a synthetic guild built
+from fake Discord objects, and reports throughput and tail latency.
+
+    python -m benchmarks.load [--members 10000] [--invocations 5000]
+        [--concurrency 200] [--api-latency-ms 0] [--commands "points add" ...] [--json]
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import platform
+import random
+import time
+
+import discord
+
+from benchmarks import git_commit, in_temp_dir, load_bot
+from benchmarks.fakes import FakeGuild, FakeInteraction, FakeMember
+from benchmarks.synthetic import FIRST_USER_ID, make_config, make_members, make_points
+from metrics import percentile
+
+COMMANDS = ["points add", "log event", "log leaderboard", "leaderboard"]
+
+
+def command_objects(bot):
+    return {
+        "points add": bot.points_add,
+        "log event": bot.event,
+        "log leaderboard": bot.log_leaderboard,
+        "leaderboard": bot.leaderboard,
+    }
+
+
+def make_arguments(name, command, rng, members):
+    """Random but valid arguments for one invocation of `command`."""
+    choices = {p.name: p.choices for p in command.parameters}
+    user = rng.choice(members)
+    if name == "points add":
+        return {"user": user, "amount": rng.choice((1, 2.5, 5, 10))}
+    if name == "log event":
+        return {
+            "user": user,
+            "event_type": rng.choice(choices["event_type"]),
+            "attendance_type": rng.choice(choices["attendance_type"]),
+        }
+    if name == "log leaderboard":
+        return {
+            "user": user,
+            "task": rng.choice(choices["task"]),
+            "amount": rng.randint(1, 5),
+        }
+    return {"page": str(rng.randint(1, max(len(members) // 10, 1)))}
+
+
+async def invoke(bot, tree, command, interaction, arguments):
+    """Runs the command the way ASOFCommandTree would; returns the outcome."""
+    try:
+        if not await tree.interaction_check(interaction):
+            return "denied"
+        if not await command._check_can_run(interaction):
+            return "denied"
+        await command.callback(interaction, **arguments)
+    except Exception:
+        bot.record_interaction(interaction, failed=True)
+        return "failed"
+    bot.record_interaction(interaction)
+    return "ok"
+
+
+async def run_load(members, invocations, concurrency, api_latency, commands, seed=0):
+    rng = random.Random(seed)
+    with in_temp_dir():
+        bot = load_bot()
+        import storage
+
+        points = make_points(members, seed=seed)
+        config = make_config()
+        storage.points_store.replace(points)
+        storage.config_store.replace(config)
+        storage.store_writer.flush_all()
+
+        guild_members = make_members(points, config, seed=seed)
+        executor = FakeMember(FIRST_USER_ID - 100, roles=[bot.logistics_id])
+        guild = FakeGuild(guild_members + [executor])
+        humans = [m for m in guild_members if not m.bot]
+        objects = command_objects(bot)
+        tree = bot.ASOFCommandTree(discord.Client(intents=bot.intents))
+
+        plan = []
+        for _ in range(invocations):
+            name = rng.choice(commands)
+            plan.append((name, make_arguments(name, objects[name], rng, humans)))
+
+        latencies = collections.defaultdict(list)
+        outcomes = collections.defaultdict(collections.Counter)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(name, arguments):
+            async with semaphore:
+                command = objects[name]
+                interaction = FakeInteraction(
+                    guild, executor, command, arguments, api_latency
+                )
+                start = time.perf_counter()
+                outcome = await invoke(bot, tree, command, interaction, arguments)
+                latencies[name].append(time.perf_counter() - start)
+                outcomes[name][outcome] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(name, arguments) for name, arguments in plan))
+        wall = time.perf_counter() - start
+        storage.store_writer.flush_all()
+
+    results = []
+    for name in commands:
+        timings = sorted(latencies[name])
+        results.append(
+            {
+                "command": name,
+                "invocations": len(timings),
+                **outcomes[name],
+                "p50_ms": percentile(timings, 50) * 1000,
+                "p95_ms": percentile(timings, 95) * 1000,
+                "p99_ms": percentile(timings, 99) * 1000,
+                "max_ms": (timings[-1] if timings else 0) * 1000,
+            }
+        )
+    return {
+        "members": members,
+        "invocations": invocations,
+        "concurrency": concurrency,
+        "api_latency_ms": api_latency * 1000,
+        "seconds": wall,
+        "throughput": invocations / wall,
+        "commands": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--members", type=int, default=10_000)
+    parser.add_argument("--invocations", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument(
+        "--api-latency-ms", type=float, default=0, help="delay per fake Discord call"
+    )
+    parser.add_argument("--commands", nargs="+", choices=COMMANDS, default=COMMANDS)
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    result = asyncio.run(
+        run_load(
+            args.members,
+            args.invocations,
+            args.concurrency,
+            args.api_latency_ms / 1000,
+            args.commands,
+        )
+    )
+    if args.json:
+        result.update(commit=git_commit(), python=platform.python_version())
+        print(json.dumps(result, indent=4))
+        return
+
+    print(
+        f"{result['invocations']} invocations against {result['members']} members "
+        f"in {result['seconds']:.2f}s: {result['throughput']:.0f}/s"
+    )
+    print(
+        f"{'command':<18}{'n':>7}{'ok':>7}{'denied':>7}{'failed':>7}"
+        f"{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    )
+    for r in result["commands"]:
+        print(
+            f"{r['command']:<18}{r['invocations']:>7}{r.get('ok', 0):>7}"
+            f"{r.get('denied', 0):>7}{r.get('failed', 0):>7}{r['p50_ms']:>9.2f}"
+            f"{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['max_ms']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+SERIALIZER BENCHMARK
+
+Compares load time, save time and file size of points.json for every
+installed serializer, indented and compact.
+
+    python -m benchmarks.serializers [--sizes 1000 10000] [--repeat 5] [--json]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+import storage
+from benchmarks import time_call
+from benchmarks.synthetic import SIZES, make_points
+
+
+def run(sizes, repeat):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            data = make_points(size)
+            for name, serializer in storage.SERIALIZERS.items():
+                for compact in (False, True):
+                    file = os.path.join(directory, f"{name}-{size}.json")
+                    save = time_call(
+                        lambda: storage.write_json_atomic(file, data, serializer, compact),
+                        repeat,
+                    )
+                    load = time_call(lambda: storage.read_json(file, serializer), repeat)
+                    results.append(
+                        {
+                            "users": size,
+                            "serializer": name,
+                            "compact": compact,
+                            "save_ms": save * 1000,
+                            "load_ms": load * 1000,
+                            "bytes": os.path.getsize(file),
+                        }
+                    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return
+
+    print(f"{'users':>8} {'serializer':<10} {'format':<8} {'save ms':>9} {'load ms':>9} {'KiB':>9}")
+    for r in results:
+        print(
+            f"{r['users']:>8} {r['serializer']:<10} "
+            f"{'compact' if r['compact'] else 'indented':<8} "
+            f"{r['save_ms']:>9.2f} {r['load_ms']:>9.2f} {r['bytes'] / 1024:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+SYNTHETIC GUILD DATA
+"""
+
+import random
+from datetime import datetime, timedelta
+
+SIZES = [1_000, 10_000, 100_000]
+FIRST_USER_ID = 300_000_000_000_000_000
+FIRST_ROLE_ID = 200_000_000_000_000_000
+BOT_MEMBERS = 5
+
+# (rank, points required, qualification it needs besides the points)
+RANK_TABLE = [
+    ("Recruit", 0, None),
+    ("Private", 10, None),
+    ("Private First Class", 25, None),
+    ("Lance Corporal", 50, None),
+    ("Corporal", 100, None),
+    ("Sergeant", 175, "NCO Course"),
+    ("Staff Sergeant", 275, "NCO Course"),
+    ("Sergeant First Class", 400, "NCO Course"),
+    ("Master Sergeant", 550, "NCO Course"),
+    ("Sergeant Major", 750, "NCO Course"),
+    ("Second Lieutenant", 1000, "Officer Training"),
+    ("First Lieutenant", 1300, "Officer Training"),
+    ("Captain", 1700, "Officer Training"),
+    ("Major", 2200, "Officer Training"),
+    ("Colonel", 3000, "Officer Training"),
+]
+QUALIFICATIONS = {"NCO Course": FIRST_ROLE_ID + 100, "Officer Training": FIRST_ROLE_ID + 101}
+
+VALUES = {
+    "ad": 1,
+    "adX3": 3,
+    "recruitment": 2,
+    "recruitmentsession": 4,
+    "rally": 2,
+    "rallyX5": 3,
+    "patrol": 2,
+    "gamenight": 1,
+    "training": 3,
+    "raid": 4,
+    "hosting": 2,
+    "cohosting": 1,
+    "booster": 0.5,
+    "joint": 1,
+    "eventlogging": 0.5,
+    "contractpayment": 2,
+    "nameplate": 1,
+    "basecommander": 5,
+    "bank": 1,
+    "goldbar": 0.25,
+    "trainee": 1,
+    "visitortransport": 1,
+    "pizzadelivery": 0.5,
+}
+
+
+def user_ids(count: int):
+    return [str(FIRST_USER_ID + i) for i in range(count)]
+
+
+def make_points(count: int, departed_ratio=0.05, seed=0):
+    rng = random.Random(seed)
+    now = datetime.now()
+    data = {}
+    for uid in user_ids(count):
+        left_at = None
+        if rng.random() < departed_ratio:
+            left_at = (now - timedelta(days=rng.uniform(0, 60))).isoformat()
+        # Most members sit near zero, a few regulars have thousands
+        points = int(rng.paretovariate(1.2) * 10) - 10
+        centipoints = points * 100 + rng.choice((0, 0, 0, 50))
+        data[uid] = {"centipoints": centipoints, "left_at": left_at}
+    return data
+
+
+def make_config():
+    ranks = {}
+    for i, (name, points_required, qualification) in enumerate(RANK_TABLE):
+        ranks[name] = {
+            "role_id": FIRST_ROLE_ID + i,
+            "points_required": points_required,
+            "requires_roles": [QUALIFICATIONS[qualification]] if qualification else [],
+        }
+    return {"values": dict(VALUES), "ranks": ranks}
+
+
+def make_member(uid, roles=(), bot=False):
+    # Imported here so benchmarks that only need points data don't need discord.py
+    from benchmarks.fakes import FakeMember
+
+    return FakeMember(uid, roles, bot)
+
+
+def make_members(points: dict, config: dict, promotion_due_ratio=0.2, seed=0):
+    """
+    Members for everyone in `points` who hasn't left, holding the rank role
+    their points earn them. Some are a rank behind, so a promotion check on
+    them finds one due, and some hold the qualification roles.
+    """
+    rng = random.Random(seed)
+    ranks = sorted(config["ranks"].values(), key=lambda r: r["points_required"])
+    members = []
+    for uid, info in points.items():
+        if info.get("left_at"):
+            continue
+        earned = [r for r in ranks if info["centipoints"] >= r["points_required"] * 100]
+        held = earned[:-1] if len(earned) > 1 and rng.random() < promotion_due_ratio else earned
+        roles = [held[-1]["role_id"]] if held else []
+        for role_id in QUALIFICATIONS.values():
+            if rng.random() < 0.3:
+                roles.append(role_id)
+        members.append(make_member(uid, roles))
+    for i in range(BOT_MEMBERS):
+        members.append(make_member(FIRST_USER_ID - 1 - i, bot=True))
+    return members
@@ -12,17 +12,32 @@ IMPORTS
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import json
-import os
 import asyncio
 import re
 import sys
 from datetime import datetime, timedelta
 import functools
+from storage import (
+    tidy_number,
+    get_value,
+    get_scaled_value,
+    to_scaled,
+    to_points,
+    set_value,
+    load_ranks,
+    list_rank_names,
+    edit_rank,
+    remove_rank,
+    load_points,
+    get_points,
+    add_points,
+    set_points,
+    mark_joined,
+    mark_left,
+    remove_users,
+)
 
 # Constants
-POINTS_FILE = "points.json"
-CONFIG_FILE = "config.json"
 JSON_CLEANUP_INTERVAL = 12  # hours
 REMOVE_AFTER_DAYS = 30  # days
 
@@ -51,26 +66,6 @@ PRIVILEGE_GROUP_ROLE_IDS = {
 UTILITY FUNCTIONS
 """
 
-def tidy_number(num):
-    return int(num) if isinstance(num, float) and num.is_integer() else num
-
-
-def load_json(file, default):
-    if not os.path.exists(file):
-        with open(file, "w") as f:
-            json.dump(default, f, indent=4)
-    with open(file, "r") as f:
-        data = json.load(f)
-    return {
-        k: tidy_number(v) if isinstance(v, (int, float)) else v for k, v in data.items()
-    }
-
-
-def save_json(file, data):
-    with open(file, "w") as f:
-        json.dump(data, f, indent=4)
-
-
 def privileged_check(group: str = None, target_param: str | list[str] = None):
     async def predicate(interaction: discord.Interaction) -> bool:
         allowed_roles = set(ALWAYS_PRIVILEGED_ROLE_IDS)
@@ -118,26 +113,6 @@ def privileged_check(group: str = None, target_param: str | list[str] = None):
 POINTS AND CONFIG
 """
 
-def edit_rank(name: str, role_id: int, points_required: int, requires_roles: list[int]):
-    data = load_config()
-    data["ranks"][name] = {
-        "role_id": role_id,
-        "points_required": points_required,
-        "requires_roles": requires_roles
-    }
-    save_config(data)
-
-def remove_rank(name: str):
-    data = load_config()
-    if name in data["ranks"]:
-        del data["ranks"][name]
-        save_config(data)
-        return True
-    return False
-
-def list_rank_names():
-    return list(load_ranks().keys())
-
 async def rank_autocomplete(
     interaction: discord.Interaction,
     current: str
@@ -184,115 +159,6 @@ class RankEditModal(discord.ui.Modal, title="Add or Edit Rank"):
             await interaction.response.send_message(msg, ephemeral=True)
 
 
-def load_points():
-    data = load_json(POINTS_FILE, {})
-    for uid, info in data.items():
-        info["points"] = tidy_number(info.get("points", 0))
-    return data
-
-
-def save_points(data):
-    for uid, info in data.items():
-        info["points"] = tidy_number(info.get("points", 0))
-    save_json(POINTS_FILE, data)
-
-def load_values():
-    default_values = {
-        "ad": 0,
-        "adX3": 0,
-        "recruitment": 0,
-        "recruitmentsession": 0,
-        "rally": 0,
-        "rallyX5": 0,
-        "patrol": 0,
-        "gamenight": 0,
-        "training": 0,
-        "raid": 0,
-        "hosting": 0,
-        "cohosting": 0,
-        "booster": 0,
-        "joint": 0,
-        "eventlogging": 0,
-        "contractpayment": 0,
-        "nameplate": 0,
-        "basecommander": 0,
-        "bank": 0,
-        "goldbar": 0,
-        "trainee": 0,
-        "visitortransport": 0,
-        "pizzadelivery": 0
-    }
-    if not os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, "w") as f:
-            json.dump({"values": default_values, "ranks": {}}, f, indent=4)
-    with open(CONFIG_FILE, "r") as f:
-        data = json.load(f)
-    if "values" not in data:
-        data["values"] = default_values
-    for key, val in default_values.items():
-        if key not in data["values"]:
-            data["values"][key] = val
-    for key in data["values"]:
-        data["values"][key] = tidy_number(data["values"][key])
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(data, f, indent=4)
-
-    return data["values"]
-
-def load_config():
-    if not os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, "w") as f:
-            json.dump({"values": {}, "ranks": {}}, f, indent=4)
-    with open(CONFIG_FILE, "r") as f:
-        return json.load(f)
-
-def save_config(data):
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(data, f, indent=4)
-
-def get_value(key: str):
-    return load_config()["values"].get(key, 0)
-
-def set_value(key: str, value: float):
-    data = load_config()
-    if "values" not in data:
-        data["values"] = {}
-    data["values"][key] = tidy_number(value)
-    save_config(data)
-
-def load_ranks():
-    return load_config().get("ranks", {})
-
-def add_rank(name: str, role_id: int, points_required: int, requires_roles: list[int]):
-    data = load_config()
-    data["ranks"][name] = {
-        "role_id": role_id,
-        "points_required": points_required,
-        "requires_roles": requires_roles
-    }
-    save_config(data)
-
-"""
-POINTS HELPERS
-"""
-
-def get_points(uid: int):
-    return load_points().get(str(uid), {}).get("points", 0)
-
-
-def add_points(uid: int, amount: int):
-    data = load_points()
-    entry = data.setdefault(str(uid), {"points": 0, "left_at": None})
-    entry["points"] += amount
-    save_points(data)
-
-
-def set_points(uid: int, amount: int):
-    data = load_points()
-    entry = data.setdefault(str(uid), {"points": 0, "left_at": None})
-    entry["points"] = amount
-    save_points(data)
-
 """
 CHECK FOR PROMOTIONS
 """
@@ -322,7 +188,7 @@ async def check_for_promotion(member: discord.Member):
             continue
 
         if (
-            points >= required_points and
+            points >= to_scaled(required_points) and
             all(rid in user_role_ids for rid in required_roles) and
             role_id not in user_role_ids
         ):
@@ -398,39 +264,32 @@ EVENTS
 
 @bot.event
 async def on_member_join(member):
-    data = load_points()
-    if str(member.id) not in data:
-        data[str(member.id)] = {"points": 0, "left_at": None}
-        save_points(data)
+    joined = mark_joined(member.id)
+    if joined == "added":
         print(f"Added {member.name} to points.json")
+    elif joined == "rejoined":
+        print(f"{member.name} rejoined, keeping their points")
 
 
 @bot.event
 async def on_member_remove(member):
-    data = load_points()
-    if str(member.id) in data:
-        data[str(member.id)]["left_at"] = datetime.now().isoformat()
-        save_points(data)
-        print(f"Marked {member.name} as left at {datetime.now().isoformat()}")
+    left_at = datetime.now().isoformat()
+    if mark_left(member.id, left_at):
+        print(f"Marked {member.name} as left at {left_at}")
 
 
 @tasks.loop(hours=JSON_CLEANUP_INTERVAL)
 async def cleanup_inactive_users():
-    data = load_points()
     now = datetime.utcnow()
-    removed = [
-        uid
-        for uid, info in data.items()
-        if info.get("left_at")
+    removed = remove_users(
+        lambda info: info.get("left_at")
         and now - datetime.fromisoformat(info["left_at"])
-        > timedelta(days=REMOVE_AFTER_DAYS)
-    ]
-    for uid in removed:
-        del data[uid]
+        > timedelta(days=REMOVE_AFTER_DAYS),
+        archive=True,
+    )
     if removed:
-        save_points(data)
         print(
-            f"Removed {len(removed)} users inactive for over {REMOVE_AFTER_DAYS} days."
+            f"Archived {len(removed)} users inactive for over {REMOVE_AFTER_DAYS} days."
         )
 
 
@@ -580,7 +439,7 @@ async def config_ranks_list(interaction: discord.Interaction):
 @promotion_check
 async def points_check(interaction: discord.Interaction, user: discord.User = None):
     target = user or interaction.user
-    points = get_points(target.id)
+    points = to_points(get_points(target.id))
     msg = ""
     if points >= 5000:
         msg = "🤑 "
@@ -598,9 +457,9 @@ async def points_check(interaction: discord.Interaction, user: discord.User = No
 async def points_add(
     interaction: discord.Interaction, user: discord.User, amount: float
 ):
-    add_points(user.id, amount)
+    add_points(user.id, to_scaled(amount))
     amount = tidy_number(amount)
-    msg = f"Added **{amount}** points to **{user.mention}**, bringing their total to **{get_points(user.id)}**."
+    msg = f"Added **{amount}** points to **{user.mention}**, bringing their total to **{to_points(get_points(user.id))}**."
     return msg
 
 
@@ -613,9 +472,9 @@ async def points_add(
 async def points_subtract(
     interaction: discord.Interaction, user: discord.User, amount: float
 ):
-    add_points(user.id, -abs(amount))
+    add_points(user.id, -to_scaled(abs(amount)))
     amount = tidy_number(amount)
-    msg = f"Removed **{abs(amount)}** points from **{user.mention}**, bringing their total to **{get_points(user.id)}**."
+    msg = f"Removed **{abs(amount)}** points from **{user.mention}**, bringing their total to **{to_points(get_points(user.id))}**."
     await interaction.response.send_message(msg, allowed_mentions=discord.AllowedMentions.none())
     print(msg)
 
@@ -629,7 +488,7 @@ async def points_subtract(
 async def points_set(
     interaction: discord.Interaction, user: discord.User, amount: float
 ):
-    set_points(user.id, amount)
+    set_points(user.id, to_scaled(amount))
     amount = tidy_number(amount)
     msg = f"Set the points of **{user.mention}** to **{amount}**"
     return msg
@@ -671,23 +530,23 @@ async def event(
 
     # Attendance types
     if attendance_type.value == "attending":
-        added = get_value(event_type.value)
+        added = get_scaled_value(event_type.value)
     else:
-        added = get_value(event_type.value) + get_value(attendance_type.value)
+        added = get_scaled_value(event_type.value) + get_scaled_value(attendance_type.value)
 
     member = interaction.guild.get_member(user.id)
 
     booster_bonus = 0
     if member and discord.utils.get(member.roles, id=booster_id):
-        booster_bonus = get_value("booster")
+        booster_bonus = get_scaled_value("booster")
         added += booster_bonus
     add_points(user.id, added)
-    msg = f"Added **{added}** points to **{user.mention}** for {attendance_type.name.lower().replace(" ", "-")} a **{event_type.name}**."
+    msg = f"Added **{to_points(added)}** points to **{user.mention}** for {attendance_type.name.lower().replace(" ", "-")} a **{event_type.name}**."
 
     if booster_bonus > 0:  # Checks if member is a server booster
-        msg += f"\n<:booster_icon:1425732545986822164> That includes an extra **{booster_bonus}** points for being a **Server Booster**! Thank you for supporting the division!"
+        msg += f"\n<:booster_icon:1425732545986822164> That includes an extra **{to_points(booster_bonus)}** points for being a **Server Booster**! Thank you for supporting the division!"
 
-    msg += f"\nThey now have **{get_points(user.id)}** points."
+    msg += f"\nThey now have **{to_points(get_points(user.id))}** points."
     return msg
 
 
@@ -705,10 +564,10 @@ async def event(
 async def recruitment(
     interaction: discord.Interaction, user: discord.User, amount: int = 1
 ):
-    added = get_value("recruitment") * amount
+    added = get_scaled_value("recruitment") * amount
     add_points(user.id, added)
-    msg = f"Added **{added}** points to **{user.mention}** for **recruiting** **{amount}** members.\n"
-    msg += f" They now have **{get_points(user.id)}** points."
+    msg = f"Added **{to_points(added)}** points to **{user.mention}** for **recruiting** **{amount}** members.\n"
+    msg += f" They now have **{to_points(get_points(user.id))}** points."
     return msg
 
 # /log rally command
@@ -735,12 +594,12 @@ async def rally(
     rally: app_commands.Choice[str],
 ):
     if amount_attendees >= 5:
-        added = get_value("rallyX5")
+        added = get_scaled_value("rallyX5")
     else:
-        added = get_value("rally")
+        added = get_scaled_value("rally")
     add_points(user.id, added)
-    msg = f"Added **{added}** points to **{user.mention}** for representing ASOF at the **{rally.name}** with {str(amount_attendees - 1).replace("-1", "0")} other{"" if amount_attendees == 1 else "1"}."
-    msg += f"\nThey now have **{get_points(user.id)}** points"
+    msg = f"Added **{to_points(added)}** points to **{user.mention}** for representing ASOF at the **{rally.name}** with {str(amount_attendees - 1).replace("-1", "0")} other{"" if amount_attendees == 1 else "1"}."
+    msg += f"\nThey now have **{to_points(get_points(user.id))}** points"
     return msg
 
 
@@ -772,9 +631,9 @@ async def log_leaderboard(
     task: app_commands.Choice[str],
     amount: int = 1,
 ):
-    added = get_value(task.value) * amount
+    added = get_scaled_value(task.value) * amount
     add_points(user.id, added)
-    msg = f"Added **{added}** points to **{user.mention}** for "
+    msg = f"Added **{to_points(added)}** points to **{user.mention}** for "
     if task.value == "visitortransport":
         msg += f"transporting **{amount}** visitor{"" if amount == 1 else "1"}."
     elif task.value == "pizzadelivery":
@@ -787,7 +646,7 @@ async def log_leaderboard(
         msg += f"training **{amount}** trainee{"" if amount == 1 else "s"}."
     elif task.value == "basecommander":
         msg += f"Eliminating **{amount}** Base Commander{"s" if amount > 1 else ""}."
-    msg += f"\nThey now have **{get_points(user.id)}** points"
+    msg += f"\nThey now have **{to_points(get_points(user.id))}** points"
     return msg
 
 
@@ -805,10 +664,10 @@ async def log_leaderboard(
 async def nameplate(
     interaction: discord.Interaction, user: discord.User, amount: int = 1
 ):
-    added = get_value("nameplate") * amount
+    added = get_scaled_value("nameplate") * amount
     add_points(user.id, added)
-    msg = f"Added **{added}** points to **{user.mention}** for designing **{amount}** nameplate{"" if amount == 1 else "s"}."
-    msg += f"\nThey now have **{get_points(user.id)}** points"
+    msg = f"Added **{to_points(added)}** points to **{user.mention}** for designing **{amount}** nameplate{"" if amount == 1 else "s"}."
+    msg += f"\nThey now have **{to_points(get_points(user.id))}** points"
     return msg
 
 # Log ad command
@@ -822,12 +681,12 @@ async def log_ad(
     interaction: discord.Interaction, user: discord.User, amount: int
     ):
     if amount == 3 or amount == 6:
-        added = get_value("adX3")
+        added = get_scaled_value("adX3")
     else:
-        added = get_value("ad")
+        added = get_scaled_value("ad")
     add_points(user.id, added)
-    msg = f"Added **{added}** points to **{user.mention}** for posting **{amount}** ads in one day"
-    msg += f"\nThey now have **{get_points(user.id)}** points"
+    msg = f"Added **{to_points(added)}** points to **{user.mention}** for posting **{amount}** ads in one day"
+    msg += f"\nThey now have **{to_points(get_points(user.id))}** points"
     return msg
 
 """
@@ -861,7 +720,7 @@ async def leaderboard(interaction: discord.Interaction, page: str):
     members = {str(m.id): m for m in guild.members if not m.bot}
 
     leaderboard_list = [
-        (int(uid), info.get("points", 0))
+        (int(uid), info.get("centipoints", 0))
         for uid, info in points_data.items()
         if uid in members
     ]
@@ -906,8 +765,7 @@ async def leaderboard(interaction: discord.Interaction, page: str):
     for rank, (user_id, points) in enumerate(display_list, start=1 + rank_offset):
         member = members.get(str(user_id))
         name = member.mention if member else f"Unknown User ({user_id})"
-        points_display = int(points) if float(points).is_integer() else points
-        lines.append(f"**#{rank}** — {name}: {points_display} points")
+        lines.append(f"**#{rank}** — {name}: {to_points(points)} points")
 
     if page.lower() == "all":
         title = f"🏆 Full Leaderboard — {len(leaderboard_list)} players"
@@ -0,0 +1,145 @@
+"""
+ASOF DIAGNOSTICS
+"""
+
+"""
+IMPORTS
+"""
+
+import asyncio
+import collections
+import cProfile
+import gc
+import io
+import marshal
+import pstats
+import time
+import tracemalloc
+
+"""
+CONSTANTS
+"""
+
+PROFILE_MAX_SECONDS = 120
+PROFILE_TOP_FUNCTIONS = 40
+MEMORY_TRACE_FRAMES = 10  # stack depth kept per allocation
+MEMORY_TOP_SITES = 25
+MEMORY_TOP_TYPES = 30
+
+"""
+PROFILING
+"""
+
+_profile_lock = asyncio.Lock()
+
+
+def profile_running():
+    return _profile_lock.locked()
+
+
+async def profile_loop(seconds):
+    """
+    Profile everything the event loop runs for `seconds`.
+
+    cProfile only sees the thread that enabled it, which here is the loop
+    thread, so this covers every command, event handler and task but not
+    the storage writer or logging threads. Returns the text report and the
+    raw stats in the format pstats/snakeviz load.
+    """
+    async with _profile_lock:
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+        elapsed = time.perf_counter() - started
+
+    stats = pstats.Stats(profiler)
+    report = io.StringIO()
+    report.write(f"Profiled the event loop for {elapsed:.1f} s\n\n")
+    stats.stream = report
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_FUNCTIONS)
+    report.write("\n")
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(PROFILE_TOP_FUNCTIONS)
+    return report.getvalue(), marshal.dumps(stats.stats)
+
+
+"""
+MEMORY
+"""
+
+_memory_baseline = None  # (tracemalloc snapshot, object counts by type)
+
+
+def _take_snapshot():
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        )
+    )
+    counts = collections.Counter(type(o).__qualname__ for o in gc.get_objects())
+    return snapshot, counts
+
+
+def memory_baseline():
+    global _memory_baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(MEMORY_TRACE_FRAMES)
+    _memory_baseline = _take_snapshot()
+
+
+def memory_stop():
+    global _memory_baseline
+    tracemalloc.stop()
+    _memory_baseline = None
+
+
+def memory_report():
+    """
+    Report the biggest allocation sites and object counts, and how both
+    have grown since the baseline.
+
+    Starts tracing and takes the baseline on first use; allocations made
+    before that are invisible to tracemalloc, so the first report only has
+    object counts to go on. Walks every tracked object, so it holds the GIL
+    for a noticeable moment on a large guild; call it from a thread.
+    """
+    if _memory_baseline is None:
+        memory_baseline()
+    baseline, baseline_counts = _memory_baseline
+    snapshot, counts = _take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+
+    report = io.StringIO()
+    report.write(
+        f"Traced memory: {current / 2**20:.1f} MiB now, {peak / 2**20:.1f} MiB peak, "
+        f"tracemalloc itself {tracemalloc.get_tracemalloc_memory() / 2**20:.1f} MiB\n"
+    )
+
+    report.write(f"\nGrowth since baseline, top {MEMORY_TOP_SITES} sites:\n")
+    for stat in snapshot.compare_to(baseline, "lineno")[:MEMORY_TOP_SITES]:
+        report.write(f"{stat}\n")
+
+    report.write(f"\nLargest allocation sites, top {MEMORY_TOP_SITES}:\n")
+    for stat in snapshot.statistics("traceback")[:MEMORY_TOP_SITES]:
+        report.write(f"{stat.size / 2**10:.1f} KiB in {stat.count} blocks\n")
+        for line in stat.traceback.format(most_recent_first=True)[:6]:
+            report.write(f"    {line}\n")
+
+    report.write(f"\nObject types that grew most since baseline, top {MEMORY_TOP_TYPES}:\n")
+    growth = counts.copy()
+    growth.subtract(baseline_counts)
+    for name, change in growth.most_common(MEMORY_TOP_TYPES):
+        if change <= 0:
+            break
+        report.write(f"{counts[name]:>10} {change:>+9}  {name}\n")
+
+    report.write(f"\nObjects by type, top {MEMORY_TOP_TYPES}:\n")
+    for name, count in counts.most_common(MEMORY_TOP_TYPES):
+        report.write(f"{count:>10} {count - baseline_counts[name]:>+9}  {name}\n")
+    return report.getvalue()
@@ -0,0 +1,109 @@
+"""
+ASOF DEPARTURE EXPIRY
+"""
+
+"""
+IMPORTS
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime
+
+"""
+CONSTANTS
+"""
+
+MAX_SLEEP = 6 * 60 * 60  # seconds; re-check now and then in case the clock jumps
+
+log = logging.getLogger("asof.expiry")
+
+"""
+EXPIRY QUEUE
+"""
+
+
+class ExpiryQueue:
+    """
+    Min-heap of departed members keyed by when their entry expires.
+
+    Cancelling only forgets the uid in `_expiries`; the stale heap entry is
+    skipped when it reaches the top, so rejoins are O(1) and the heap never
+    needs re-sorting. run() sleeps until the earliest expiry, or until a
+    schedule()/cancel() might have changed it.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl  # seconds from leaving to expiring
+        self._heap = []
+        self._expiries = {}  # uid -> expiry timestamp of its live heap entry
+        self._wakeup = None
+
+    def __len__(self):
+        return len(self._expiries)
+
+    def expiry_for(self, left_at: str) -> float:
+        return datetime.fromisoformat(left_at).timestamp() + self.ttl
+
+    def schedule(self, uid: str, left_at: str):
+        expires_at = self.expiry_for(left_at)
+        self._expiries[uid] = expires_at
+        heapq.heappush(self._heap, (expires_at, uid))
+        self._wake()
+
+    def cancel(self, uid: str):
+        if self._expiries.pop(uid, None) is not None:
+            self._wake()
+
+    def load(self, points_data: dict):
+        self._expiries = {
+            uid: self.expiry_for(info["left_at"])
+            for uid, info in points_data.items()
+            if info.get("left_at")
+        }
+        self._heap = [(expires_at, uid) for uid, expires_at in self._expiries.items()]
+        heapq.heapify(self._heap)
+        self._wake()
+
+    def _discard_stale(self):
+        while self._heap and self._expiries.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_expiry(self):
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float = None) -> list[str]:
+        now = time.time() if now is None else now
+        due = []
+        while (expires_at := self.next_expiry()) is not None and expires_at <= now:
+            _, uid = heapq.heappop(self._heap)
+            del self._expiries[uid]
+            due.append(uid)
+        return due
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self, expire):
+        """Calls `expire(uids)` with each batch of entries as they fall due."""
+        self._wakeup = asyncio.Event()
+        while True:
+            due = self.pop_due()
+            if due:
+                try:
+                    expire(due)
+                except Exception:
+                    log.exception("Failed to expire %d departed members", len(due))
+            next_expiry = self.next_expiry()
+            timeout = MAX_SLEEP
+            if next_expiry is not None:
+                timeout = min(max(next_expiry - time.time(), 0), MAX_SLEEP)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except TimeoutError:
+                pass
@@ -0,0 +1,277 @@
+"""
+ASOF LOGGING
+"""
+
+"""
+IMPORTS
+"""
+
+import asyncio
+import atexit
+import collections
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+
+import aiohttp
+import discord
+
+"""
+CONSTANTS
+"""
+
+WEBHOOK_MESSAGE_LIMIT = 2000  # Discord's content limit
+WEBHOOK_BUFFER_LINES = 5000  # oldest lines are dropped past this
+WEBHOOK_BATCH_DELAY = 2  # seconds to gather lines before sending
+WEBHOOK_MAX_BACKOFF = 60  # seconds
+LOG_FIELDS = ("command", "user", "guild", "duration_ms", "file_io")
+
+log = logging.getLogger("asof")
+
+"""
+FORMATTERS
+"""
+
+
+def record_fields(record):
+    return {
+        field: getattr(record, field)
+        for field in LOG_FIELDS
+        if getattr(record, field, None) is not None
+    }
+
+
+class StructuredFormatter(logging.Formatter):
+    """Appends any structured fields on the record as key=value pairs."""
+
+    def format(self, record):
+        text = super().format(record)
+        fields = record_fields(record)
+        if not fields:
+            return text
+        return f"{text} [{' '.join(f'{k}={v}' for k, v in fields.items())}]"
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **record_fields(record),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+"""
+WEBHOOK FORWARDING
+"""
+
+
+class WebhookLogHandler(logging.Handler):
+    """
+    Buffers log lines and posts them to a Discord webhook in batches.
+
+    emit() only appends to a bounded deque, so it never blocks the
+    QueueListener thread that calls it. run() is a task on the bot's event
+    loop that packs the buffered lines into as few 2000-character messages
+    as possible and backs off when the webhook fails or is rate limited.
+    """
+
+    def __init__(self, url, level=logging.INFO, max_lines=WEBHOOK_BUFFER_LINES):
+        super().__init__(level)
+        self.url = url
+        self.lines = collections.deque(maxlen=max_lines)
+        self.dropped = 0
+        self.unreported_drops = 0
+        self.sent_lines = 0
+        self.sent_messages = 0
+        self.failures = 0
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+        self.setFormatter(
+            StructuredFormatter("[%(levelname)s] %(name)s: %(message)s")
+        )
+        # Don't forward discord.py's own reports about this webhook
+        self.addFilter(lambda record: not record.name.startswith("discord.webhook"))
+
+    def emit(self, record):
+        try:
+            text = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+                self.unreported_drops += 1
+            self.lines.append(line)
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # The loop closed between the check and the call
+                pass
+
+    def _take_batch(self):
+        self.acquire()
+        try:
+            message = ""
+            if self.unreported_drops:
+                message = f"⚠️ {self.unreported_drops} log lines dropped\n"
+                self.unreported_drops = 0
+            while self.lines:
+                line = self.lines[0]
+                room = WEBHOOK_MESSAGE_LIMIT - len(message) - 1
+                if len(line) > WEBHOOK_MESSAGE_LIMIT - 1:
+                    # Split lines that could never fit into one message
+                    if room <= 0:
+                        break
+                    self.lines[0] = line[room:]
+                    message += line[:room] + "\n"
+                    break
+                if len(line) > room:
+                    break
+                message += line + "\n"
+                self.lines.popleft()
+                self.sent_lines += 1
+            return message
+        finally:
+            self.release()
+
+    async def run(self, batch_delay=WEBHOOK_BATCH_DELAY):
+        # emit() only wakes the sender once _loop is set, so the event comes first
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        async with aiohttp.ClientSession() as session:
+            webhook = discord.Webhook.from_url(self.url, session=session)
+            backoff = 1
+            batch = ""
+            while True:
+                if not batch and not self.lines:
+                    await self._wakeup.wait()
+                    self._wakeup.clear()
+                    await asyncio.sleep(batch_delay)
+                batch = batch or self._take_batch()
+                if not batch:
+                    continue
+                try:
+                    await webhook.send(
+                        batch, allowed_mentions=discord.AllowedMentions.none()
+                    )
+                except (
+                    discord.HTTPException,
+                    aiohttp.ClientError,
+                    asyncio.TimeoutError,
+                ):
+                    # discord.py already retried 429s; wait longer before the next go
+                    self.failures += 1
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, WEBHOOK_MAX_BACKOFF)
+                    continue
+                self.sent_messages += 1
+                batch = ""
+                backoff = 1
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def aclose(self, timeout=10):
+        # Give the sender a moment to drain the buffer before shutting down
+        try:
+            async with asyncio.timeout(timeout):
+                while self.lines and self._task and not self._task.done():
+                    if self._wakeup is not None:
+                        self._wakeup.set()
+                    await asyncio.sleep(0.5)
+        except TimeoutError:
+            pass
+        if self._task:
+            self._task.cancel()
+        self._loop = None
+        self.close()
+
+    def stats(self):
+        return {
+            "sent_lines": self.sent_lines,
+            "sent_messages": self.sent_messages,
+            "buffered": len(self.lines),
+            "dropped": self.dropped,
+            "failures": self.failures,
+        }
+
+
+"""
+SETUP
+"""
+
+
+def setup_logging(level=None, webhook_url=None, json_format=None):
+    """
+    Route every log record through a queue to the console and, optionally,
+    the Discord webhook.
+
+    Loggers only put records on the queue; formatting, console writes and
+    webhook buffering happen on the QueueListener's thread so the event loop
+    never waits on them. Returns the webhook handler, whose sender task has
+    to be started on the running loop.
+    """
+    level = level or os.getenv("LOG_LEVEL", "INFO").upper()
+    if json_format is None:
+        json_format = os.getenv("LOG_FORMAT", "").lower() == "json"
+
+    console = logging.StreamHandler()
+    if json_format:
+        console.setFormatter(JsonFormatter())
+    else:
+        console.setFormatter(
+            StructuredFormatter("%(asctime)s %(levelname)-8s %(name)s: %(message)s")
+        )
+    handlers = [console]
+
+    forwarder = None
+    if webhook_url:
+        forwarder = WebhookLogHandler(webhook_url)
+        handlers.append(forwarder)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener.start()
+    atexit.register(listener.stop)
+    return forwarder
+
+
+def interaction_fields(interaction):
+    started = interaction.extras.get("started")
+    command = interaction.command
+    return {
+        "command": command.qualified_name if command else None,
+        "user": interaction.user.id,
+        "guild": interaction.guild_id,
+        "duration_ms": (
+            None
+            if started is None
+            else round((time.perf_counter() - started) * 1000, 1)
+        ),
+        "file_io": sum(
+            v
+            for k, v in interaction.extras.get("io", {}).items()
+            if k.endswith(("_reads", "_writes"))
+        ),
+    }
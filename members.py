@@ -0,0 +1,52 @@
+"""
+ASOF MEMBER REGISTRY
+"""
+
+"""
+IMPORTS
+"""
+
+import collections
+
+"""
+MEMBER REGISTRY
+"""
+
+
+class MemberRegistry:
+    """
+    Ids (as strings, like points.json keys) of the human members of each
+    guild, kept current from gateway events so lookups never walk the
+    member cache. A guild is loaded from its member cache the first time
+    it's asked for and again on every on_ready. `versions` counts changes
+    per guild, for caches that depend on who's in it.
+    """
+
+    def __init__(self):
+        self._guilds = {}  # guild id -> set of member ids
+        self.versions = collections.Counter()
+
+    def load(self, guild):
+        self._guilds[guild.id] = {str(m.id) for m in guild.members if not m.bot}
+        self.versions[guild.id] += 1
+
+    def members(self, guild) -> set[str]:
+        if guild.id not in self._guilds:
+            self.load(guild)
+        return self._guilds[guild.id]
+
+    def count(self, guild) -> int:
+        return len(self.members(guild))
+
+    def add(self, member):
+        if not member.bot:
+            self.members(member.guild).add(str(member.id))
+            self.versions[member.guild.id] += 1
+
+    def remove(self, member):
+        self.members(member.guild).discard(str(member.id))
+        self.versions[member.guild.id] += 1
+
+    def forget(self, guild):
+        self._guilds.pop(guild.id, None)
+        self.versions[guild.id] += 1
@@ -0,0 +1,458 @@
+"""
+ASOF METRICS
+"""
+
+"""
+IMPORTS
+"""
+
+import asyncio
+import collections
+import contextlib
+import functools
+import logging
+import math
+import sys
+import threading
+import time
+import traceback
+
+import discord.webhook.async_
+from aiohttp import web
+
+import storage
+from storage import io_counter
+
+"""
+CONSTANTS
+"""
+
+COMMAND_SAMPLES = 1000  # most recent invocations kept per command
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # seconds
+LOOP_LAG_INTERVAL = 0.5  # seconds between event-loop lag samples
+LOOP_LAG_WARNING = 0.25  # seconds; slower than this turns on slow-callback logging
+LOOP_DEBUG_COOLDOWN = 300  # seconds without lag before it's turned off again
+STALL_REPORT_INTERVAL = 60  # seconds; at most one stack report per interval
+
+log = logging.getLogger("asof.loop")
+
+"""
+HISTOGRAMS
+"""
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+"""
+COMMAND METRICS
+"""
+
+CommandSample = collections.namedtuple(
+    "CommandSample", ["duration", "storage", "reads", "writes", "api_calls"]
+)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0
+    # Nearest-rank, which is exact enough for a few hundred samples
+    rank = max(math.ceil(q / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def io_totals(counter):
+    return {
+        "reads": sum(v for k, v in counter.items() if k.endswith("_reads")),
+        "writes": sum(v for k, v in counter.items() if k.endswith("_writes")),
+        "api_calls": counter.get("api_calls", 0),
+        "storage": counter.get("storage_seconds", 0.0),
+    }
+
+
+class CommandStats:
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.samples = collections.deque(maxlen=COMMAND_SAMPLES)
+        self.latency = Histogram()
+
+    def record(self, duration, counter, failed=False):
+        totals = io_totals(counter)
+        self.latency.observe(duration)
+        self.count += 1
+        self.failures += failed
+        self.samples.append(
+            CommandSample(
+                duration,
+                totals["storage"],
+                totals["reads"],
+                totals["writes"],
+                totals["api_calls"],
+            )
+        )
+
+    def summary(self):
+        durations = sorted(s.duration for s in self.samples)
+        n = len(self.samples) or 1
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "p50_ms": percentile(durations, 50) * 1000,
+            "p95_ms": percentile(durations, 95) * 1000,
+            "p99_ms": percentile(durations, 99) * 1000,
+            "max_ms": (durations[-1] if durations else 0) * 1000,
+            "storage_ms": sum(s.storage for s in self.samples) / n * 1000,
+            "reads": sum(s.reads for s in self.samples) / n,
+            "writes": sum(s.writes for s in self.samples) / n,
+            "api_calls": sum(s.api_calls for s in self.samples) / n,
+        }
+
+
+command_stats = collections.defaultdict(CommandStats)
+
+
+def record_command(name, duration, counter, failed=False):
+    command_stats[name].record(duration, counter, failed)
+
+
+"""
+GEMINI AND EVENT LOOP
+"""
+
+gemini_latency = Histogram()
+gemini_errors = 0
+
+
+@contextlib.contextmanager
+def time_gemini_call():
+    global gemini_errors
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        gemini_errors += 1
+        raise
+    finally:
+        gemini_latency.observe(time.perf_counter() - start)
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes a task that asked to sleep.
+
+    Once the lag passes `threshold`, asyncio's debug mode is switched on so
+    it logs every callback slower than the threshold, and switched off again
+    after `cooldown` quiet seconds. A watchdog thread also checks that the
+    task keeps ticking; if the loop is stuck it logs the loop thread's
+    current stack, which names the blocking call while it's still blocking.
+    """
+
+    def __init__(
+        self,
+        interval=LOOP_LAG_INTERVAL,
+        threshold=LOOP_LAG_WARNING,
+        cooldown=LOOP_DEBUG_COOLDOWN,
+        report_interval=STALL_REPORT_INTERVAL,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.report_interval = report_interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.histogram = Histogram()
+        self.stalls = 0
+        self.suppressed_reports = 0
+        self._last_tick = time.monotonic()
+        self._last_slow = None
+        self._last_report = None
+        self._reported_tick = None
+        self._last_slow_callback = None
+        self._loop_thread = None
+        self._task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self._last_tick = time.monotonic()
+            lag = max(loop.time() - start - self.interval, 0.0)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.histogram.observe(lag)
+            self._update_debug(loop, lag)
+
+    def _update_debug(self, loop, lag):
+        if lag > self.threshold:
+            self._last_slow = self._last_tick
+            if not loop.get_debug():
+                loop.slow_callback_duration = self.threshold
+                loop.set_debug(True)
+                log.warning(
+                    "Event loop lagged %.0f ms; logging callbacks slower than %.0f ms",
+                    lag * 1000,
+                    self.threshold * 1000,
+                )
+        elif (
+            loop.get_debug()
+            and self._last_slow is not None
+            and self._last_tick - self._last_slow > self.cooldown
+        ):
+            loop.set_debug(False)
+            self._last_slow = None
+            log.info("Event loop lag back to normal; slow-callback logging off")
+
+    def _watch(self):
+        while True:
+            time.sleep(self.threshold / 2)
+            tick = self._last_tick
+            stalled = time.monotonic() - tick - self.interval
+            if stalled < self.threshold or tick == self._reported_tick:
+                continue
+            # One report per stall, and at most one per report_interval
+            self._reported_tick = tick
+            self.stalls += 1
+            now = time.monotonic()
+            if (
+                self._last_report is not None
+                and now - self._last_report < self.report_interval
+            ):
+                self.suppressed_reports += 1
+                continue
+            self._last_report = now
+            self._report(stalled)
+
+    def _report(self, stalled):
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = "".join(traceback.format_stack(frame, limit=20)) if frame else "unavailable\n"
+        suppressed = self.suppressed_reports
+        self.suppressed_reports = 0
+        log.warning(
+            "Event loop blocked for %.1f s so far%s; loop thread is at:\n%s",
+            stalled,
+            f" ({suppressed} earlier stalls not reported)" if suppressed else "",
+            stack.rstrip(),
+        )
+
+    def _limit_slow_callbacks(self, record):
+        # asyncio logs "Executing <Handle ...> took 0.5 seconds" for every slow
+        # callback in debug mode; forward at most one per report_interval
+        if not record.getMessage().startswith("Executing "):
+            return True
+        now = time.monotonic()
+        if (
+            self._last_slow_callback is not None
+            and now - self._last_slow_callback < self.report_interval
+        ):
+            return False
+        self._last_slow_callback = now
+        return True
+
+    def start(self):
+        if self._task is None:
+            logging.getLogger("asyncio").addFilter(self._limit_slow_callbacks)
+            self._loop_thread = threading.get_ident()
+            self._last_tick = time.monotonic()
+            self._task = asyncio.get_running_loop().create_task(self.run())
+            threading.Thread(
+                target=self._watch, name="loop-watchdog", daemon=True
+            ).start()
+        return self._task
+
+
+loop_lag = LoopLagMonitor()
+
+
+"""
+DISCORD API CALLS
+"""
+
+
+def _counted(request):
+    @functools.wraps(request)
+    async def wrapper(*args, **kwargs):
+        counter = io_counter.get()
+        if counter is not None:
+            counter["api_calls"] += 1
+        return await request(*args, **kwargs)
+
+    return wrapper
+
+
+@functools.cache
+def _instrument_webhook_adapter():
+    # Interaction responses and followups go through discord.py's shared
+    # webhook adapter rather than the bot's HTTPClient
+    adapter = discord.webhook.async_.async_context.get()
+    adapter.request = _counted(adapter.request)
+
+
+def instrument_api_calls(bot):
+    bot.http.request = _counted(bot.http.request)
+    _instrument_webhook_adapter()
+
+
+"""
+PROMETHEUS ENDPOINT
+"""
+
+# name -> (help, callable returning [(labels, value), ...]) for values that
+# only the bot knows about, like each hosted bot's gateway latency
+gauges = {}
+
+
+def register_gauge(name, help, collect):
+    gauges[name] = (help, collect)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _metric(lines, name, kind, help, samples):
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labels)} {value}")
+
+
+def _histogram(lines, name, help, histograms):
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in histograms:
+        for bound, count in histogram.cumulative():
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {count}")
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+
+def render_prometheus():
+    lines = []
+    commands = sorted(command_stats.items())
+    _metric(
+        lines,
+        "asof_commands_total",
+        "counter",
+        "App commands completed or failed.",
+        [({"command": name}, stats.count) for name, stats in commands],
+    )
+    _metric(
+        lines,
+        "asof_command_failures_total",
+        "counter",
+        "App commands that raised an error.",
+        [({"command": name}, stats.failures) for name, stats in commands],
+    )
+    _histogram(
+        lines,
+        "asof_command_duration_seconds",
+        "Wall time of app commands.",
+        [({"command": name}, stats.latency) for name, stats in commands],
+    )
+    _histogram(
+        lines,
+        "asof_gemini_request_duration_seconds",
+        "Latency of Gemini generate_content calls.",
+        [({}, gemini_latency)],
+    )
+    _metric(
+        lines,
+        "asof_gemini_errors_total",
+        "counter",
+        "Gemini calls that raised.",
+        [({}, gemini_errors)],
+    )
+    _histogram(
+        lines,
+        "asof_event_loop_lag_seconds",
+        "How late the event loop ran a task that asked to wake up.",
+        [({}, loop_lag.histogram)],
+    )
+    _metric(
+        lines,
+        "asof_event_loop_lag_max_seconds",
+        "gauge",
+        "Worst event loop lag seen since start.",
+        [({}, loop_lag.max_lag)],
+    )
+    _metric(
+        lines,
+        "asof_event_loop_stalls_total",
+        "counter",
+        "Times the watchdog found the event loop blocked.",
+        [({}, loop_lag.stalls)],
+    )
+
+    stores = [s.stats() for s in (storage.points_store, storage.config_store)]
+    for name, kind, help, key in (
+        ("asof_storage_cache_hits_total", "counter", "Loads served from memory.", "cache_hits"),
+        ("asof_storage_cache_misses_total", "counter", "Loads that read the file.", "cache_misses"),
+        ("asof_storage_writes_requested_total", "counter", "Changes queued for writing.", "requested_writes"),
+        ("asof_storage_flushes_total", "counter", "Writes to disk.", "flushes"),
+        ("asof_storage_flush_seconds_total", "counter", "Time spent writing to disk.", "flush_seconds_total"),
+    ):
+        _metric(lines, name, kind, help, [({"file": s["file"]}, s[key]) for s in stores])
+    _metric(
+        lines,
+        "asof_storage_flush_max_seconds",
+        "gauge",
+        "Slowest write to disk since start.",
+        [({"file": s["file"]}, s["max_flush_ms"] / 1000) for s in stores],
+    )
+    _metric(
+        lines,
+        "asof_storage_cache_hit_ratio",
+        "gauge",
+        "Share of loads served from memory.",
+        [
+            ({"file": s["file"]}, s["cache_hits"] / ((s["cache_hits"] + s["cache_misses"]) or 1))
+            for s in stores
+        ],
+    )
+
+    for name, (help, collect) in sorted(gauges.items()):
+        _metric(lines, name, "gauge", help, collect())
+    return "\n".join(lines) + "\n"
+
+
+async def _handle_metrics(request):
+    return web.Response(
+        text=render_prometheus(), content_type="text/plain", charset="utf-8"
+    )
+
+
+async def start_metrics_server(port, host="127.0.0.1"):
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
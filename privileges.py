@@ -0,0 +1,74 @@
+"""
+ASOF PRIVILEGES
+"""
+
+"""
+IMPORTS
+"""
+
+from storage import config_store, load_config
+
+"""
+PRIVILEGE TABLE
+"""
+
+
+class PrivilegeTable:
+    """
+    Who may use privileged commands. Reads the "privileges" section of
+    config.json, falling back to the defaults passed in for anything it
+    leaves out:
+
+        "privileges": {"always_roles": [role ids], "always_users": [user ids],
+                       "groups": {"logistics": [role ids], ...}}
+
+    Each group's allowed roles are a frozenset that already includes the
+    always-privileged roles, rebuilt only when config.json changes. Each
+    member's answer per group is cached, per guild since a user has
+    different roles in each, until forget() is called for them or the
+    config changes.
+    """
+
+    def __init__(self, always_roles, always_users, groups):
+        self.defaults = {
+            "always_roles": always_roles,
+            "always_users": always_users,
+            "groups": groups,
+        }
+        self._version = None  # config_store.version the sets were built from
+        self._users = frozenset()
+        self._roles = {}  # group -> frozenset of role ids
+        self._decisions = {}  # (guild id, member id) -> {group: allowed}
+
+    def _refresh(self):
+        config = load_config()
+        if self._version == config_store.version:
+            return
+        privileges = {**self.defaults, **config.get("privileges", {})}
+        groups = {**self.defaults["groups"], **privileges["groups"]}
+        always = frozenset(privileges["always_roles"])
+        self._users = frozenset(privileges["always_users"])
+        self._roles = {None: always}
+        for group, role_ids in groups.items():
+            self._roles[group] = always | frozenset(role_ids)
+        self._decisions.clear()
+        self._version = config_store.version
+
+    def roles(self, group: str = None) -> frozenset:
+        self._refresh()
+        return self._roles.get(group, self._roles[None])
+
+    def allowed(self, member, group: str = None) -> bool:
+        roles = self.roles(group)
+        decisions = self._decisions.setdefault((member.guild.id, member.id), {})
+        if group not in decisions:
+            decisions[group] = member.id in self._users or any(
+                r.id in roles for r in member.roles
+            )
+        return decisions[group]
+
+    def forget(self, member):
+        self._decisions.pop((member.guild.id, member.id), None)
+
+    def clear(self):
+        self._decisions.clear()
@@ -0,0 +1,76 @@
+"""
+ASOF POINTS RECOMPUTE
+"""
+
+"""
+IMPORTS
+"""
+
+import os
+
+from storage import to_scaled
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None
+
+"""
+CONSTANTS
+"""
+
+RECOMPUTE_KIND = "recompute"  # ledger "k" of the adjustments a recompute applies
+RECOMPUTE_LOCK_FILE = "points.recompute"  # file_lock()ed while a recompute is applied
+
+"""
+REPLAY
+"""
+
+
+def replay_awards(ledger, values: dict) -> dict:
+    """
+    Returns uid -> centipoints to add so every award in the ledger is worth
+    what it would be under `values`.
+
+    Each award recorded its {value key: count}, so its worth under the new
+    table is a dot product. What a user has been credited is the sum of
+    their awards as logged plus any earlier recompute adjustments, which
+    makes running this twice against the same values a no-op. Changes
+    without a recorded award (manual /points edits, awards logged before
+    awards were recorded) are left as they are. Reads the whole ledger, so
+    call it from a thread.
+    """
+    if np is None:
+        raise RuntimeError("Recomputing points needs numpy installed.")
+
+    keys = {}  # value key -> column
+    credit_users, credit_amounts = [], []
+    term_users, term_keys, term_counts = [], [], []
+    if os.path.exists(ledger.file):
+        for _, event in ledger.read_from(0):
+            award = event.get("w")
+            if award is None and event.get("k") != RECOMPUTE_KIND:
+                continue
+            credit_users.append(event["u"])
+            credit_amounts.append(event["d"])
+            for key, count in (award or {}).items():
+                term_users.append(event["u"])
+                term_keys.append(keys.setdefault(key, len(keys)))
+                term_counts.append(count)
+
+    scaled = np.array([to_scaled(values.get(key, 0)) for key in keys], dtype=np.int64)
+    users, inverse = np.unique(
+        np.array(credit_users + term_users, dtype=np.uint64), return_inverse=True
+    )
+    credited = np.zeros(len(users), dtype=np.int64)
+    np.add.at(credited, inverse[: len(credit_users)], np.array(credit_amounts, dtype=np.int64))
+    target = np.zeros(len(users), dtype=np.int64)
+    np.add.at(
+        target,
+        inverse[len(credit_users) :],
+        np.array(term_counts, dtype=np.int64) * scaled[np.array(term_keys, dtype=np.intp)],
+    )
+
+    difference = target - credited
+    changed = np.flatnonzero(difference)
+    return {str(int(users[i])): int(difference[i]) for i in changed}
@@ -0,0 +1,1112 @@
+"""
+ASOF STORAGE
+"""
+
+"""
+IMPORTS
+"""
+
+import atexit
+import contextlib
+import contextvars
+import copy
+import fcntl
+import json
+import logging
+import os
+import stat
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from collections import namedtuple
+from datetime import date, datetime
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec  # type: ignore
+except ImportError:
+    msgspec = None
+
+"""
+CONSTANTS
+"""
+
+POINTS_FILE = "points.json"
+CONFIG_FILE = "config.json"
+ARCHIVE_FILE = "points.archive"
+LEDGER_FILE = "points.ledger"
+RETENTION_DAYS = 92  # days of rolling totals kept, enough for a season
+ARCHIVE_COMPRESSION = 9  # zlib level; archiving is rare and blocks are small
+FLUSH_DELAY = 0.5  # seconds to wait for more changes before writing
+SLOW_FLUSH_WARNING = 1.0  # seconds
+POINTS_SCALE = 100  # points are stored as integer hundredths ("centipoints")
+POINTS_COMPACT = True  # write points.json without indentation
+SET_KIND = "set"  # ledger "k" of set_points corrections
+
+log = logging.getLogger("asof.storage")
+
+# Commands set this to a Counter to see how many store reads and writes
+# they caused and how long they spent in the store, e.g.
+# {"points_reads": 1, "points_writes": 2, "storage_seconds": 0.0004}
+io_counter = contextvars.ContextVar("io_counter", default=None)
+
+# Commands set this to who is changing points and why, e.g.
+# {"actor": 805175554209873940, "reason": "log event patrol", "source": url},
+# so every add_points()/set_points() call lands in the ledger with it
+change_context = contextvars.ContextVar("change_context", default=None)
+
+DEFAULT_VALUES = {
+    "ad": 0,
+    "adX3": 0,
+    "recruitment": 0,
+    "recruitmentsession": 0,
+    "rally": 0,
+    "rallyX5": 0,
+    "patrol": 0,
+    "gamenight": 0,
+    "training": 0,
+    "raid": 0,
+    "hosting": 0,
+    "cohosting": 0,
+    "booster": 0,
+    "joint": 0,
+    "eventlogging": 0,
+    "contractpayment": 0,
+    "nameplate": 0,
+    "basecommander": 0,
+    "bank": 0,
+    "goldbar": 0,
+    "trainee": 0,
+    "visitortransport": 0,
+    "pizzadelivery": 0,
+}
+
+"""
+UTILITY FUNCTIONS
+"""
+
+
+def tidy_number(num):
+    return int(num) if isinstance(num, float) and num.is_integer() else num
+
+
+def to_scaled(points) -> int:
+    return round(points * POINTS_SCALE)
+
+
+def to_points(scaled: int):
+    whole, remainder = divmod(scaled, POINTS_SCALE)
+    return whole if remainder == 0 else scaled / POINTS_SCALE
+
+
+"""
+SERIALIZERS
+"""
+
+Serializer = namedtuple("Serializer", ["name", "dumps", "loads"])
+
+
+def _json_dumps(data, compact=False):
+    if compact:
+        return json.dumps(data, separators=(",", ":")).encode()
+    return json.dumps(data, indent=4).encode()
+
+
+def _orjson_dumps(data, compact=False):
+    # orjson only supports two-space indentation
+    return orjson.dumps(data, option=0 if compact else orjson.OPT_INDENT_2)
+
+
+def _msgspec_dumps(data, compact=False):
+    raw = msgspec.json.encode(data)
+    return raw if compact else msgspec.json.format(raw, indent=4)
+
+
+SERIALIZERS = {"json": Serializer("json", _json_dumps, json.loads)}
+if orjson is not None:
+    SERIALIZERS["orjson"] = Serializer("orjson", _orjson_dumps, orjson.loads)
+if msgspec is not None:
+    SERIALIZERS["msgspec"] = Serializer(
+        "msgspec", _msgspec_dumps, msgspec.json.decode
+    )
+
+
+def get_serializer(name: str = None) -> Serializer:
+    # ASOF_SERIALIZER pins a backend, otherwise the fastest installed one wins
+    name = name or os.getenv("ASOF_SERIALIZER")
+    if name:
+        if name not in SERIALIZERS:
+            raise ValueError(
+                f"Serializer {name!r} is not available, "
+                f"choose from {', '.join(SERIALIZERS)}"
+            )
+        return SERIALIZERS[name]
+    for name in ("orjson", "msgspec", "json"):
+        if name in SERIALIZERS:
+            return SERIALIZERS[name]
+
+
+"""
+FILE HELPERS
+"""
+
+
+@contextlib.contextmanager
+def file_lock(file, exclusive=True):
+    # The lock lives in a sidecar file because every write replaces the data
+    # file's inode, which would silently drop a lock held on the old one.
+    with open(file + ".lock", "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def read_json(file, serializer: Serializer = None):
+    serializer = serializer or get_serializer()
+    with open(file, "rb") as f:
+        return serializer.loads(f.read())
+
+
+def _file_mode(file):
+    try:
+        return stat.S_IMODE(os.stat(file).st_mode)
+    except FileNotFoundError:
+        # What open() would have created: 0666 less the umask
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def write_json_atomic(file, data, serializer: Serializer = None, compact=False):
+    serializer = serializer or get_serializer()
+    payload = serializer.dumps(data, compact)
+    directory = os.path.dirname(os.path.abspath(file))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(file)}.", suffix=".tmp"
+    )
+    try:
+        # mkstemp creates files as 0600; keep the mode the file already had
+        os.fchmod(fd, _file_mode(file))
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+
+"""
+JSON STORE
+"""
+
+MISSING = object()  # an absent key, in JsonStore merges
+
+
+class JsonStore:
+    """
+    Cached view of a JSON file shared with other bot processes.
+
+    Reads are served from memory and only hit the disk when another process
+    has replaced the file. transaction() edits the cache in place and hands
+    the write to store_writer, which flushes the latest state from its own
+    thread. If another process wrote the file in the meantime, only the
+    top-level keys this process changed are written, each through
+    merge(base, ours, on_disk): `base` is the key's value before this
+    process's pending changes, so a merge can re-apply them as a delta
+    instead of overwriting the other process's. MISSING stands for an
+    absent key. The default merge keeps this process's value.
+
+    `version` goes up whenever the cached data may have changed, so callers
+    can cache things derived from it.
+
+    Lock order is always file_lock() first, then self._lock.
+    """
+
+    def __init__(
+        self,
+        file,
+        default,
+        normalise=None,
+        snapshot=copy.deepcopy,
+        merge=None,
+        serializer=None,
+        compact=False,
+    ):
+        self.file = file
+        self.name = os.path.splitext(os.path.basename(file))[0]
+        self.default = default
+        self.normalise = normalise
+        self.snapshot = snapshot
+        self.merge = merge or (lambda base, ours, on_disk: ours)
+        self.serializer = serializer or get_serializer()
+        self.compact = compact
+        self._data = None
+        self._signature = None
+        self._lock = threading.RLock()
+        self._dirty_keys = set()
+        self._dirty_all = False
+        self._bases = {}  # dirty key -> its value before the pending changes
+        self._flushing = False
+        self.version = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.requested_writes = 0
+        self.flush_count = 0
+        self.flush_total = 0.0
+        self.flush_max = 0.0
+        self.last_flush = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.file)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _read_file(self):
+        data = read_json(self.file, self.serializer)
+        if self.normalise:
+            self.normalise(data)
+        return data
+
+    def _write_file(self, data):
+        write_json_atomic(self.file, data, self.serializer, self.compact)
+
+    def _count(self, kind):
+        counter = io_counter.get()
+        if counter is not None:
+            counter[f"{self.name}_{kind}"] += 1
+
+    def _add_time(self, seconds):
+        counter = io_counter.get()
+        if counter is not None:
+            counter["storage_seconds"] += seconds
+
+    def _pending(self):
+        return self._dirty_all or bool(self._dirty_keys) or self._flushing
+
+    def _refresh(self):
+        signature = self._stat()
+        if signature is None:
+            data = copy.deepcopy(self.default)
+            self._write_file(data)
+            self._data, self._signature = data, self._stat()
+            self.version += 1
+        elif self._data is None or (
+            signature != self._signature and not self._pending()
+        ):
+            self._data, self._signature = self._read_file(), signature
+            self.version += 1
+            self._count("reads")
+
+    def load(self):
+        start = time.perf_counter()
+        try:
+            if self._data is not None and (
+                self._pending() or self._stat() == self._signature
+            ):
+                self.cache_hits += 1
+                return self._data
+            self.cache_misses += 1
+            with file_lock(self.file, exclusive=not os.path.exists(self.file)):
+                with self._lock:
+                    self._refresh()
+            return self._data
+        finally:
+            self._add_time(time.perf_counter() - start)
+
+    @contextlib.contextmanager
+    def transaction(self, *keys):
+        # With no keys the whole document is treated as changed
+        self.load()
+        with self._lock:
+            # A merged flush may have swapped the cache since load() returned
+            data = self._data
+            for key in keys:
+                if key not in self._bases:
+                    self._bases[key] = (
+                        copy.deepcopy(data[key]) if key in data else MISSING
+                    )
+            try:
+                yield data
+            finally:
+                if keys:
+                    self._dirty_keys.update(keys)
+                else:
+                    self._dirty_all = True
+                self.version += 1
+                self.requested_writes += 1
+                self._count("writes")
+        store_writer.schedule(self)
+
+    def replace(self, data):
+        with self._lock:
+            self._data = data
+            self._dirty_all = True
+            self.version += 1
+            self.requested_writes += 1
+            self._count("writes")
+        store_writer.schedule(self)
+
+    def flush(self):
+        start = time.perf_counter()
+        with file_lock(self.file):
+            with self._lock:
+                if not (self._dirty_all or self._dirty_keys):
+                    return None
+                snapshot = self.snapshot(self._data)
+                keys, whole, bases = self._dirty_keys, self._dirty_all, self._bases
+                self._dirty_keys, self._dirty_all, self._bases = set(), False, {}
+                self._flushing = True
+                merge = not whole and self._stat() not in (self._signature, None)
+            try:
+                if merge:
+                    on_disk = self._read_file()
+                    for key in keys:
+                        ours = snapshot.get(key, MISSING)
+                        value = self.merge(
+                            bases.get(key, ours), ours, on_disk.get(key, MISSING)
+                        )
+                        if value is MISSING:
+                            on_disk.pop(key, None)
+                        else:
+                            on_disk[key] = value
+                    snapshot = on_disk
+                self._write_file(snapshot)
+            except BaseException:
+                with self._lock:
+                    self._dirty_keys |= keys
+                    self._dirty_all |= whole
+                    # The older base is the one still missing from disk
+                    self._bases = {**self._bases, **bases}
+                    self._flushing = False
+                raise
+            with self._lock:
+                self._signature = self._stat()
+                self._flushing = False
+                if merge and not self._dirty_all:
+                    # Swap in the merged state instead of editing the dict
+                    # callers may be iterating; keys touched again since the
+                    # snapshot keep their cached values
+                    merged = dict(snapshot)
+                    for key in self._dirty_keys:
+                        if key in self._data:
+                            merged[key] = self._data[key]
+                        else:
+                            merged.pop(key, None)
+                    self._data = merged
+                    self.version += 1
+
+        duration = time.perf_counter() - start
+        self.flush_count += 1
+        self.flush_total += duration
+        self.flush_max = max(self.flush_max, duration)
+        self.last_flush = duration
+        return duration
+
+    def stats(self):
+        return {
+            "file": self.file,
+            "serializer": self.serializer.name,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "requested_writes": self.requested_writes,
+            "flushes": self.flush_count,
+            "flush_seconds_total": self.flush_total,
+            "coalesced": self.requested_writes - self.flush_count,
+            "avg_flush_ms": (
+                self.flush_total / self.flush_count * 1000 if self.flush_count else 0
+            ),
+            "max_flush_ms": self.flush_max * 1000,
+            "last_flush_ms": None if self.last_flush is None else self.last_flush * 1000,
+        }
+
+
+class StoreWriter:
+    """
+    Single background thread that flushes dirty stores.
+
+    A burst of transactions inside FLUSH_DELAY is written once, with only the
+    latest state.
+    """
+
+    def __init__(self, delay=FLUSH_DELAY):
+        self.delay = delay
+        self._cond = threading.Condition()
+        self._pending = set()
+        self._thread = None
+
+    def schedule(self, store):
+        with self._cond:
+            self._pending.add(store)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="store-writer", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            time.sleep(self.delay)
+            self.flush_all()
+
+    def flush_all(self):
+        with self._cond:
+            stores, self._pending = self._pending, set()
+        for store in stores:
+            try:
+                duration = store.flush()
+            except Exception as e:
+                log.error("Failed to write %s: %s", store.file, e)
+                with self._cond:
+                    self._pending.add(store)
+                continue
+            if duration is not None and duration > SLOW_FLUSH_WARNING:
+                log.warning("Writing %s took %.0fms", store.file, duration * 1000)
+
+
+store_writer = StoreWriter()
+# Daemon threads are killed at exit, so write anything still queued
+atexit.register(store_writer.flush_all)
+
+
+def _migrate_points(data):
+    # Files written before fixed-point storage hold float "points"
+    for info in data.values():
+        if "points" in info:
+            info["centipoints"] = to_scaled(info.pop("points"))
+
+
+def _snapshot_points(data):
+    return {uid: dict(info) for uid, info in data.items()}
+
+
+def _merge_points(base, ours, on_disk):
+    """
+    Re-applies this process's change to one user on top of the file: points
+    as a delta, so concurrent awards from two processes both count, and
+    other fields only if this process changed them.
+    """
+    if ours is MISSING or on_disk is MISSING:
+        return ours
+    if base is MISSING:
+        base = {"centipoints": 0, "left_at": None}
+    merged = dict(on_disk)
+    merged["centipoints"] = (
+        on_disk.get("centipoints", 0) + ours["centipoints"] - base["centipoints"]
+    )
+    for field, value in ours.items():
+        if field != "centipoints" and value != base.get(field):
+            merged[field] = value
+    return merged
+
+
+def _normalise_config(data):
+    data.setdefault("values", {})
+    data.setdefault("ranks", {})
+    data.setdefault("live_leaderboards", {})
+
+
+points_store = JsonStore(
+    POINTS_FILE,
+    {},
+    normalise=_migrate_points,
+    snapshot=_snapshot_points,
+    merge=_merge_points,
+    compact=POINTS_COMPACT,
+)
+config_store = JsonStore(
+    CONFIG_FILE,
+    {"values": {}, "ranks": {}, "live_leaderboards": {}},
+    normalise=_normalise_config,
+)
+
+"""
+APPEND-ONLY FILES
+"""
+
+INDEX_RECORD = struct.Struct("<QQ")  # user id, offset in the data file
+
+
+class OffsetIndex:
+    """
+    Sidecar .idx file of fixed-size (user id, offset) records for an
+    append-only data file.
+
+    It is read into memory once, after which sync() only reads the records
+    appended since, by this or any other process. Offsets are kept per user
+    in append order. `scan` yields (user id, offset) pairs from the data
+    file, to rebuild a missing index.
+    """
+
+    def __init__(self, file, scan):
+        self.file = file
+        self.index_file = file + ".idx"
+        self.scan = scan
+        self._offsets = {}
+        self._size = 0
+
+    def __len__(self):
+        self.sync()
+        return len(self._offsets)
+
+    def sync(self):
+        try:
+            size = os.path.getsize(self.index_file)
+        except FileNotFoundError:
+            if os.path.exists(self.file):
+                self.rebuild()
+            return
+        if size == self._size:
+            return
+        with open(self.index_file, "rb") as f:
+            f.seek(self._size)
+            chunk = f.read(size - self._size)
+        # Ignore a record that is still being written
+        chunk = chunk[: len(chunk) - len(chunk) % INDEX_RECORD.size]
+        for uid, offset in INDEX_RECORD.iter_unpack(chunk):
+            self._offsets.setdefault(uid, array("Q")).append(offset)
+        self._size += len(chunk)
+
+    def rebuild(self):
+        log.warning("Rebuilding %s from %s", self.index_file, self.file)
+        with file_lock(self.file):
+            records = b"".join(
+                INDEX_RECORD.pack(int(uid), offset) for uid, offset in self.scan()
+            )
+            with open(self.index_file, "wb") as f:
+                f.write(records)
+        self._offsets, self._size = {}, 0
+        self.sync()
+
+    def append(self, records, durable=True):
+        # Call while holding file_lock(self.file), after writing the data
+        with open(self.index_file, "ab") as f:
+            f.write(b"".join(INDEX_RECORD.pack(int(uid), offset) for uid, offset in records))
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def get(self, uid):
+        self.sync()
+        return self._offsets.get(int(uid), ())
+
+
+def _file_size(file):
+    try:
+        return os.path.getsize(file)
+    except FileNotFoundError:
+        return 0
+
+
+"""
+COLD ARCHIVE
+"""
+
+ARCHIVE_BLOCK_HEADER = struct.Struct("<II")  # compressed size, entry count
+
+
+class ColdArchive:
+    """
+    Append-only, zlib-compressed archive of expired points.json entries.
+
+    Each append() writes one block holding a batch of entries and indexes
+    every entry in it. A lookup decompresses only the block it needs. The
+    latest block for a user wins.
+    """
+
+    def __init__(self, file, level=ARCHIVE_COMPRESSION):
+        self.file = file
+        self.level = level
+        self.index = OffsetIndex(file, self._scan)
+
+    def _blocks(self):
+        with open(self.file, "rb") as f:
+            offset = 0
+            while len(header := f.read(ARCHIVE_BLOCK_HEADER.size)) == ARCHIVE_BLOCK_HEADER.size:
+                size, _ = ARCHIVE_BLOCK_HEADER.unpack(header)
+                payload = f.read(size)
+                if len(payload) < size:
+                    break
+                yield offset, json.loads(zlib.decompress(payload))
+                offset += ARCHIVE_BLOCK_HEADER.size + size
+
+    def _scan(self):
+        for offset, entries in self._blocks():
+            for uid in entries:
+                yield uid, offset
+
+    def _read_block(self, offset):
+        with open(self.file, "rb") as f:
+            f.seek(offset)
+            size, _ = ARCHIVE_BLOCK_HEADER.unpack(f.read(ARCHIVE_BLOCK_HEADER.size))
+            return json.loads(zlib.decompress(f.read(size)))
+
+    def append(self, entries: dict):
+        if not entries:
+            return
+        archived_at = datetime.now().isoformat()
+        payload = zlib.compress(
+            json.dumps(
+                {uid: {**info, "archived_at": archived_at} for uid, info in entries.items()},
+                separators=(",", ":"),
+            ).encode(),
+            self.level,
+        )
+        with file_lock(self.file):
+            # The block must be on disk before the index points at it
+            with open(self.file, "ab") as f:
+                offset = f.tell()
+                f.write(ARCHIVE_BLOCK_HEADER.pack(len(payload), len(entries)) + payload)
+                f.flush()
+                os.fsync(f.fileno())
+            self.index.append((uid, offset) for uid in entries)
+
+    def get(self, uid):
+        offsets = self.index.get(uid)
+        if not offsets:
+            return None
+        return self._read_block(offsets[-1]).get(str(uid))
+
+    def stats(self):
+        return {"file": self.file, "users": len(self.index), "bytes": _file_size(self.file)}
+
+
+points_archive = ColdArchive(ARCHIVE_FILE)
+
+"""
+POINTS LEDGER
+"""
+
+
+class PointsLedger:
+    """
+    Append-only history of point changes, one compact JSON object per line:
+
+        {"t": unix time, "u": user, "a": actor, "d": change, "b": balance after,
+         "r": reason, "s": source message or channel}
+
+    Awards also carry "w", the {value key: count} they were worth, so they
+    can be re-valued later. set_points corrections and bulk adjustments
+    carry their kind in "k".
+
+    Amounts are centipoints. The per-user offset index lets history() seek
+    straight to one user's lines instead of reading the whole file.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.index = OffsetIndex(file, self._scan)
+        self.observers = []  # called with (start, end offset, events) after record()
+
+    def _scan(self):
+        with open(self.file, "rb") as f:
+            offset = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                yield json.loads(line)["u"], offset
+                offset += len(line)
+
+    def record(self, events: list[dict]):
+        lines = [json.dumps(e, separators=(",", ":")).encode() + b"\n" for e in events]
+        with file_lock(self.file):
+            with open(self.file, "ab") as f:
+                start = offset = f.tell()
+                f.write(b"".join(lines))
+            records = []
+            for event, line in zip(events, lines):
+                records.append((event["u"], offset))
+                offset += len(line)
+            # Losing the last few events in a power cut is acceptable here
+            self.index.append(records, durable=False)
+        for observer in self.observers:
+            observer(start, offset, events)
+
+    def offset_after(self, timestamp: int) -> int:
+        """Byte offset of the first line at or after `timestamp`, by bisection."""
+        with open(self.file, "rb") as f:
+
+            def line_at(position):
+                # The first complete line starting at or after `position`
+                if position:
+                    f.seek(position - 1)
+                    f.readline()
+                else:
+                    f.seek(0)
+                start = f.tell()
+                return start, f.readline()
+
+            lo, hi = 0, f.seek(0, os.SEEK_END)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                _, line = line_at(mid)
+                if line.endswith(b"\n") and json.loads(line)["t"] < timestamp:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return line_at(lo)[0]
+
+    def read_from(self, offset: int):
+        """Yields (end offset, event) for every complete line from `offset` on."""
+        with open(self.file, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                yield offset, json.loads(line)
+
+    def count(self, uid) -> int:
+        return len(self.index.get(uid))
+
+    def history(self, uid, limit: int, skip: int = 0) -> list[dict]:
+        """The user's changes, newest first, skipping the `skip` most recent."""
+        offsets = self.index.get(uid)
+        end = max(len(offsets) - skip, 0)
+        events = []
+        with open(self.file, "rb") as f:
+            for offset in reversed(offsets[max(end - limit, 0) : end]):
+                f.seek(offset)
+                line = f.readline()
+                if line.endswith(b"\n"):
+                    events.append(json.loads(line))
+        return events
+
+    def stats(self):
+        return {"file": self.file, "users": len(self.index), "bytes": _file_size(self.file)}
+
+
+points_ledger = PointsLedger(LEDGER_FILE)
+
+"""
+ROLLING TOTALS
+"""
+
+
+class DailyTotals:
+    """
+    Per-user point changes summed into one bucket per local day, for the
+    last `retention_days`, built from the ledger. Events with a kind
+    (set_points corrections, recompute adjustments) aren't gains, so
+    they're left out.
+
+    The first query bisects the ledger to the start of the retention window
+    and folds in only that tail. After that, changes this process records
+    are folded in as they're written, and anything other processes appended
+    is read on the next query. A window total only visits the buckets in the
+    window, so it costs the number of users active in it, not the guild size.
+    """
+
+    def __init__(self, ledger, retention_days=RETENTION_DAYS):
+        self.ledger = ledger
+        self.retention_days = retention_days
+        self._buckets = {}  # date ordinal -> {uid: centipoints}
+        self._offset = None  # ledger offset folded up to
+        ledger.observers.append(self._observe)
+
+    def _fold(self, event):
+        if "k" in event:
+            return
+        day = datetime.fromtimestamp(event["t"]).toordinal()
+        bucket = self._buckets.setdefault(day, {})
+        uid = str(event["u"])
+        bucket[uid] = bucket.get(uid, 0) + event["d"]
+
+    def _observe(self, start, end, events):
+        # Only when nothing from another process sits between us and these
+        if self._offset != start:
+            return
+        for event in events:
+            self._fold(event)
+        self._offset = end
+
+    def sync(self):
+        oldest = datetime.now().toordinal() - self.retention_days + 1
+        for day in [day for day in self._buckets if day < oldest]:
+            del self._buckets[day]
+        if self._offset is None:
+            if not os.path.exists(self.ledger.file):
+                self._offset = 0
+                return
+            since = datetime.fromordinal(oldest).timestamp()
+            self._offset = self.ledger.offset_after(int(since))
+        if self._offset == _file_size(self.ledger.file):
+            return
+        for offset, event in self.ledger.read_from(self._offset):
+            if datetime.fromtimestamp(event["t"]).toordinal() >= oldest:
+                self._fold(event)
+            self._offset = offset
+
+    def totals_since(self, day: date) -> dict:
+        """uid -> centipoints gained from the start of `day` until now."""
+        self.sync()
+        start = day.toordinal()
+        totals = {}
+        for bucket_day, bucket in self._buckets.items():
+            if bucket_day >= start:
+                for uid, delta in bucket.items():
+                    totals[uid] = totals.get(uid, 0) + delta
+        return totals
+
+
+daily_totals = DailyTotals(points_ledger)
+
+"""
+POINTS AND CONFIG
+"""
+
+
+def load_points():
+    return points_store.load()
+
+
+def save_points(data):
+    points_store.replace(data)
+
+
+def load_values():
+    with config_store.transaction("values") as data:
+        for key, val in DEFAULT_VALUES.items():
+            data["values"].setdefault(key, val)
+        for key in data["values"]:
+            data["values"][key] = tidy_number(data["values"][key])
+    return data["values"]
+
+
+def load_config():
+    return config_store.load()
+
+
+def save_config(data):
+    config_store.replace(data)
+
+
+def get_value(key: str):
+    return load_config()["values"].get(key, 0)
+
+
+def get_scaled_value(key: str) -> int:
+    return to_scaled(get_value(key))
+
+
+def award_value(award: dict) -> int:
+    """Centipoints an award of {value key: count} is worth at the current values."""
+    return sum(get_scaled_value(key) * count for key, count in award.items())
+
+
+def set_value(key: str, value: float):
+    with config_store.transaction("values") as data:
+        data["values"][key] = tidy_number(value)
+
+
+def load_ranks():
+    return load_config().get("ranks", {})
+
+
+def list_rank_names():
+    return list(load_ranks().keys())
+
+
+def edit_rank(name: str, role_id: int, points_required: int, requires_roles: list[int]):
+    with config_store.transaction("ranks") as data:
+        data["ranks"][name] = {
+            "role_id": role_id,
+            "points_required": points_required,
+            "requires_roles": requires_roles,
+        }
+
+
+add_rank = edit_rank
+
+
+def remove_rank(name: str):
+    if name not in load_ranks():
+        return False
+    with config_store.transaction("ranks") as data:
+        data["ranks"].pop(name, None)
+    return True
+
+
+def load_live_leaderboards():
+    return load_config().get("live_leaderboards", {})
+
+
+def set_live_leaderboard(
+    channel_id: int, message_id: int, bot_id: int, period: str, top: int, interval: int
+):
+    """
+    `bot_id` is the user id of the bot that posted the message, the only one
+    that can edit it. Returns the board this replaces in the channel, if any.
+    """
+    with config_store.transaction("live_leaderboards") as data:
+        boards = data.setdefault("live_leaderboards", {})
+        previous = boards.get(str(channel_id))
+        boards[str(channel_id)] = {
+            "message_id": message_id,
+            "bot_id": bot_id,
+            "period": period,
+            "top": top,
+            "interval": interval,
+        }
+    return previous
+
+
+def remove_live_leaderboard(channel_id: int):
+    if str(channel_id) not in load_live_leaderboards():
+        return None
+    with config_store.transaction("live_leaderboards") as data:
+        return data["live_leaderboards"].pop(str(channel_id), None)
+
+
+"""
+POINTS HELPERS
+"""
+
+
+# Amounts here are in centipoints; convert with to_scaled()/to_points() at
+# the edges where users type or read them.
+
+
+def get_points(uid: int) -> int:
+    return load_points().get(str(uid), {}).get("centipoints", 0)
+
+
+def update_change_context(**fields):
+    change_context.set({**(change_context.get() or {}), **fields})
+
+
+def _change_event(uid, delta: int, balance: int, reason: str = None, **fields):
+    context = change_context.get() or {}
+    return {
+        "t": int(time.time()),
+        "u": int(uid),
+        "a": context.get("actor"),
+        "d": delta,
+        "b": balance,
+        "r": reason or context.get("reason"),
+        "s": context.get("source"),
+        **fields,
+    }
+
+
+def _record_change(
+    uid: int, delta: int, balance: int, reason: str = None, award=None, kind=None
+):
+    if not delta:
+        return
+    fields = {"w": award} if award else {}
+    if kind:
+        fields["k"] = kind
+    points_ledger.record([_change_event(uid, delta, balance, reason, **fields)])
+
+
+def add_points(uid: int, amount: int, reason: str = None, award: dict = None):
+    """`award` is the {value key: count} that `amount` was worked out from."""
+    with points_store.transaction(str(uid)) as data:
+        entry = data.setdefault(str(uid), {"centipoints": 0, "left_at": None})
+        entry["centipoints"] += amount
+        balance = entry["centipoints"]
+    _record_change(uid, amount, balance, reason, award)
+
+
+def adjust_points(adjustments: dict, kind: str, reason: str = None) -> dict:
+    """
+    Adds uid -> centipoints in one transaction and one ledger write, each
+    event tagged with `kind`. Users no longer in points.json are skipped.
+    Returns uid -> new balance for the users adjusted.
+    """
+    present = load_points()
+    uids = [uid for uid, delta in adjustments.items() if delta and uid in present]
+    if not uids:
+        return {}
+    balances = {}
+    with points_store.transaction(*uids) as data:
+        for uid in uids:
+            entry = data[uid]
+            entry["centipoints"] += adjustments[uid]
+            balances[uid] = entry["centipoints"]
+    points_ledger.record(
+        [
+            _change_event(uid, adjustments[uid], balance, reason, k=kind)
+            for uid, balance in balances.items()
+        ]
+    )
+    return balances
+
+
+def set_points(uid: int, amount: int, reason: str = None):
+    with points_store.transaction(str(uid)) as data:
+        entry = data.setdefault(str(uid), {"centipoints": 0, "left_at": None})
+        delta = amount - entry["centipoints"]
+        entry["centipoints"] = amount
+    _record_change(uid, delta, amount, reason, kind=SET_KIND)
+
+
+def mark_joined(uid: int):
+    """Returns "added" for new members, "rejoined" for returning ones."""
+    info = load_points().get(str(uid))
+    if info is not None and not info.get("left_at"):
+        return None
+    with points_store.transaction(str(uid)) as data:
+        entry = data.setdefault(str(uid), {"centipoints": 0, "left_at": None})
+        entry["left_at"] = None
+    return "added" if info is None else "rejoined"
+
+
+def mark_left(uid: int, left_at: str):
+    if str(uid) not in load_points():
+        return False
+    with points_store.transaction(str(uid)) as data:
+        data[str(uid)]["left_at"] = left_at
+    return True
+
+
+def remove_users(is_expired, uids=None, archive=False):
+    """
+    Removes users for whom is_expired(info) is true, checking only `uids` if
+    given, and returns their entries. With archive=True the entries are
+    written to points_archive first.
+    """
+    data = load_points()
+    candidates = data if uids is None else (uid for uid in uids if uid in data)
+    removed = [uid for uid in candidates if is_expired(data[uid])]
+    if not removed:
+        return {}
+    with points_store.transaction(*removed) as data:
+        entries = {uid: data[uid] for uid in removed}
+        if archive:
+            points_archive.append(entries)
+        for uid in removed:
+            del data[uid]
+    return entries
+
+
+def restore_user(uid: int):
+    """Moves an archived user back into points.json and returns their entry."""
+    if str(uid) in load_points():
+        return None
+    entry = points_archive.get(uid)
+    if entry is None:
+        return None
+    entry = {**entry, "left_at": None}
+    entry.pop("archived_at", None)
+    with points_store.transaction(str(uid)) as data:
+        data.setdefault(str(uid), entry)
+    return entry